@@ -0,0 +1,365 @@
+"""
+📈 Benchmark Suite for the Quantum Triage System
+Reproducible latency / memory / quality measurements, saved as JSON
+
+Run:
+    python benchmark_quantum_triage.py
+    python benchmark_quantum_triage.py --sizes 10 100 1000 --output bench.json
+    python benchmark_quantum_triage.py --compare previous_bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(__file__))
+
+from quantum_triage import QuantumTriageOptimizer, PatientCase, BitSolution
+
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000]
+
+
+# ------------------- Synthetic rosters -------------------
+
+def generate_roster(n: int, seed: int = 0) -> List[PatientCase]:
+    """
+    Seeded synthetic patient roster
+
+    Distributions (rough ICU surge profile):
+    - severity: Beta(2, 2.5), skewed towards moderate cases
+    - age: mixture of adults N(45, 15) and elderly N(72, 8), clipped to 18-100
+    - duration: log-normal around ~24 h, clipped to 1-72 h (app slider range)
+    - priority: correlated with severity plus noise
+    - needs ventilator: more likely for severe cases
+    """
+    rng = np.random.default_rng(seed)
+
+    severity = rng.beta(2.0, 2.5, size=n)
+    elderly = rng.random(n) < 0.35
+    age = np.where(elderly, rng.normal(72, 8, size=n), rng.normal(45, 15, size=n))
+    age = np.clip(np.rint(age), 18, 100).astype(int)
+    duration = np.clip(np.rint(rng.lognormal(np.log(24), 0.5, size=n)), 1, 72).astype(int)
+    priority = np.clip(0.7 * severity + rng.normal(0.15, 0.12, size=n), 0.0, 1.0)
+    needs_vent = rng.random(n) < (0.3 + 0.65 * severity)
+    has_alt = rng.random(n) < (0.5 - 0.4 * severity)
+
+    return [
+        PatientCase(
+            patient_id=f"S{i:06d}",
+            name=f"Synthetic_{i}",
+            severity_score=float(severity[i]),
+            needs_ventilator=bool(needs_vent[i]),
+            expected_duration_hours=int(duration[i]),
+            age=int(age[i]),
+            has_alternative_treatment=bool(has_alt[i]),
+            priority_factor=float(priority[i])
+        )
+        for i in range(n)
+    ]
+
+
+def capacity_for(patients: List[PatientCase]) -> Dict[str, int]:
+    """Scarce-resource scenario: ventilators for ~30% of patients needing one"""
+    needing = [p for p in patients if p.needs_ventilator]
+    num_ventilators = max(1, int(0.3 * len(needing)))
+    mean_duration = np.mean([p.expected_duration_hours for p in needing]) if needing else 24
+    max_total_hours = max(100, int(0.8 * num_ventilators * mean_duration))
+    return {"num_ventilators": num_ventilators, "max_total_hours": max_total_hours}
+
+
+# ------------------- Measurement helpers -------------------
+
+def _time_call(fn: Callable, repeats: int) -> Dict:
+    """Wall-clock timings of `fn` over `repeats` runs"""
+    timings = []
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return {
+        "result": result,
+        "min_s": min(timings),
+        "median_s": float(np.median(timings)),
+        "runs": len(timings),
+    }
+
+
+def _peak_memory(fn: Callable) -> float:
+    """Peak traced memory (KB) while running `fn` once"""
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024.0
+
+
+def _solution_quality(optimizer: QuantumTriageOptimizer, solution: np.ndarray,
+                      patients: List[PatientCase]) -> Dict:
+    """Objective, benefit and feasibility of an annealer solution"""
+    values = np.array([optimizer._calculate_patient_value(p) for p in patients])
+    hours = np.array([p.expected_duration_hours for p in patients])
+    selected = solution.astype(bool)
+    return {
+        "qubo_cost": float(optimizer._calculate_qubo_cost(solution, patients)),
+        "benefit": float(values[selected].sum()),
+        "selected": int(selected.sum()),
+        "hours": int(hours[selected].sum()),
+        "feasible": bool(selected.sum() <= optimizer.num_ventilators
+                         and hours[selected].sum() <= optimizer.max_total_hours),
+    }
+
+
+def _greedy_benefit(optimizer: QuantumTriageOptimizer, patients: List[PatientCase]) -> float:
+    """Baseline: take patients by value while both budgets allow"""
+    ranked = sorted(patients, key=optimizer._calculate_patient_value, reverse=True)
+    vents, hours, benefit = optimizer.num_ventilators, optimizer.max_total_hours, 0.0
+    for p in ranked:
+        if vents > 0 and p.expected_duration_hours <= hours:
+            vents -= 1
+            hours -= p.expected_duration_hours
+            benefit += optimizer._calculate_patient_value(p)
+    return benefit
+
+
+# ------------------- Optimizer benchmarks -------------------
+
+def bench_optimizer(sizes: List[int], seed: int, repeats: int, memory_max_n: int) -> List[Dict]:
+    """Solve latency, memory and objective quality across roster sizes"""
+    rows = []
+    for n in sizes:
+        patients = generate_roster(n, seed=seed)
+        capacity = capacity_for(patients)
+        optimizer = QuantumTriageOptimizer(**capacity)
+        runs = repeats if n < 10000 else 1
+
+        def anneal():
+            return optimizer._simulated_annealing(patients, seed=seed)
+
+        def solve():
+            return optimizer.optimize(patients, seed=seed)
+
+        anneal_timing = _time_call(anneal, runs)
+        solve_timing = _time_call(solve, runs)
+
+        row = {
+            "n": n,
+            **capacity,
+            "iterations": optimizer.iterations,
+            "anneal_median_s": anneal_timing["median_s"],
+            "anneal_min_s": anneal_timing["min_s"],
+            "solve_median_s": solve_timing["median_s"],
+            "solve_min_s": solve_timing["min_s"],
+            "runs": anneal_timing["runs"],
+            "quality": _solution_quality(optimizer, anneal_timing["result"], patients),
+            "greedy_benefit": _greedy_benefit(optimizer, patients),
+            "estimated_lives_saved": solve_timing["result"]["estimated_lives_saved"],
+        }
+        if n <= memory_max_n:  # tracemalloc slows pure-Python loops ~3x
+            row["solve_peak_memory_kb"] = _peak_memory(solve)
+
+        print(f"  n={n:>7} | anneal {row['anneal_median_s']:.3f}s | "
+              f"solve {row['solve_median_s']:.3f}s | "
+              f"benefit {row['quality']['benefit']:.2f} (greedy {row['greedy_benefit']:.2f})")
+        rows.append(row)
+    return rows
+
+
+# ------------------- Solution representation -------------------
+
+def bench_representation(sizes: List[int], seed: int, steps: int = 1000) -> List[Dict]:
+    """
+    Per-step cost of the annealer's solution state
+
+    - dense: np.int64 vector copied on every step, then flipped
+      (the pre-bitset `_simulated_annealing` pattern)
+    - bitset: `BitSolution` flipped in place and flipped back (undo on reject)
+    """
+    rows = []
+    for n in sizes:
+        rng = np.random.default_rng(seed)
+        flips = rng.integers(0, n, size=steps).tolist()
+        dense = np.zeros(n, dtype=np.int64)
+        bits = BitSolution(n)
+
+        def dense_steps():
+            current = dense
+            for i in flips:
+                neighbor = current.copy()
+                neighbor[i] = 1 - neighbor[i]
+                current = neighbor
+
+        def bitset_steps():
+            for i in flips:
+                bits.flip(i)
+                bits.flip(i)
+
+        dense_timing = _time_call(dense_steps, 3)
+        bitset_timing = _time_call(bitset_steps, 3)
+        row = {
+            "n": n,
+            "steps": steps,
+            "dense_ns_per_step": dense_timing["min_s"] / steps * 1e9,
+            "bitset_ns_per_step": bitset_timing["min_s"] / steps * 1e9,
+            "dense_state_bytes": int(dense.nbytes),
+            "bitset_state_bytes": int(bits.words.nbytes),
+            "dense_peak_alloc_kb": _peak_memory(dense_steps),
+            "bitset_peak_alloc_kb": _peak_memory(bitset_steps),
+        }
+        print(f"  n={n:>7} | dense {row['dense_ns_per_step']:.0f} ns/step, {row['dense_state_bytes']} B | "
+              f"bitset {row['bitset_ns_per_step']:.0f} ns/step, {row['bitset_state_bytes']} B")
+        rows.append(row)
+    return rows
+
+
+# ------------------- Preprocessing / inference microbenchmarks -------------------
+
+def _load_model_if_present(relative_path: str):
+    """Load a shipped .h5 model, or None when the file/TensorFlow is unavailable"""
+    base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    model_path = os.path.join(base_path, relative_path)
+    if not os.path.exists(model_path):
+        return None
+    from tensorflow.keras.models import load_model
+    return load_model(model_path)
+
+
+def bench_pipelines(seed: int, repeats: int, with_inference: bool) -> Dict:
+    """Image and audio preprocessing (and optional inference) on synthetic inputs"""
+    results = {}
+    try:
+        from PIL import Image
+        from preprocessing import preprocess_image, compute_mel_spectrogram, render_spectrogram_input
+    except ImportError as e:
+        return {"skipped": f"preprocessing dependencies missing: {e}"}
+
+    rng = np.random.default_rng(seed)
+    xray = Image.fromarray(rng.integers(0, 256, size=(512, 512, 3), dtype=np.uint8), "RGB")
+    sr = 22050
+    t = np.arange(int(2.0 * sr)) / sr
+    cough = (0.3 * np.sin(2 * np.pi * 440 * t) * np.exp(-3 * t)
+             + 0.05 * rng.standard_normal(t.size)).astype("float32")
+
+    image_timing = _time_call(lambda: preprocess_image(xray), repeats)
+    mel_timing = _time_call(lambda: compute_mel_spectrogram(cough, sr), repeats)
+    mel_spec_db = mel_timing["result"]
+    render_timing = _time_call(lambda: render_spectrogram_input(mel_spec_db, sr), repeats)
+
+    results["image.preprocess"] = {k: v for k, v in image_timing.items() if k != "result"}
+    results["audio.melspectrogram"] = {k: v for k, v in mel_timing.items() if k != "result"}
+    results["audio.render"] = {k: v for k, v in render_timing.items() if k != "result"}
+
+    if not with_inference:
+        return results
+
+    try:
+        image_model = _load_model_if_present(os.path.join('Photo for Lung & it Model', 'Covid_19_downloadable.h5'))
+        audio_model = _load_model_if_present(os.path.join('Coughing sound & it Model', 'cough_model_multi.h5'))
+    except ImportError as e:
+        results["inference"] = {"skipped": f"TensorFlow missing: {e}"}
+        return results
+
+    image_input = image_timing["result"]
+    audio_input = render_timing["result"]
+    for name, model, model_input in [("image.predict", image_model, image_input),
+                                     ("audio.predict", audio_model, audio_input)]:
+        if model is None:
+            results[name] = {"skipped": "model file not found"}
+            continue
+        model.predict(model_input, verbose=0)  # warm-up (graph tracing)
+        timing = _time_call(lambda: model.predict(model_input, verbose=0), repeats)
+        results[name] = {k: v for k, v in timing.items() if k != "result"}
+    return results
+
+
+# ------------------- Reporting -------------------
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def compare_results(current: Dict, baseline: Dict):
+    """Print solve-time ratios against a previous benchmark JSON"""
+    previous = {row["n"]: row for row in baseline.get("optimizer", [])}
+    print(f"\n🔍 COMPARISON vs {baseline.get('commit') or 'baseline'}:")
+    print("-" * 70)
+    for row in current["optimizer"]:
+        old = previous.get(row["n"])
+        if old is None:
+            continue
+        ratio = row["solve_median_s"] / max(old["solve_median_s"], 1e-12)
+        flag = "⚠️ " if ratio > 1.1 else "  "
+        print(f"{flag}n={row['n']:>7} | solve {old['solve_median_s']:.3f}s -> "
+              f"{row['solve_median_s']:.3f}s (x{ratio:.2f})")
+
+
+def main(argv: Optional[List[str]] = None) -> Dict:
+    parser = argparse.ArgumentParser(description="Quantum Triage benchmark suite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="Previous benchmark JSON to compare against")
+    parser.add_argument("--memory-max-n", type=int, default=10000,
+                        help="Largest roster measured with tracemalloc (0 disables)")
+    parser.add_argument("--no-representation", action="store_true",
+                        help="Skip the dense vs bit-packed solution benchmark")
+    parser.add_argument("--no-pipelines", action="store_true", help="Skip image/audio microbenchmarks")
+    parser.add_argument("--no-inference", action="store_true", help="Skip model inference timings")
+    args = parser.parse_args(argv)
+
+    print("\n" + "="*70)
+    print("📈  QUANTUM TRIAGE BENCHMARK".center(70))
+    print("="*70 + "\n")
+
+    results = {
+        "commit": _git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "seed": args.seed,
+    }
+
+    print("⚛️  Optimizer scaling:")
+    results["optimizer"] = bench_optimizer(args.sizes, args.seed, args.repeats, args.memory_max_n)
+
+    if not args.no_representation:
+        print("\n🧮 Solution representation (dense int64 vs bit-packed):")
+        results["representation"] = bench_representation(args.sizes, args.seed)
+
+    if not args.no_pipelines:
+        print("\n🩻 Preprocessing / inference microbenchmarks...")
+        results["pipelines"] = bench_pipelines(args.seed, args.repeats, not args.no_inference)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Results saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare_results(results, json.load(f))
+
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -4,15 +4,18 @@ import numpy as np
 import cv2
 from tensorflow.keras.models import load_model
 from PIL import Image
-import librosa
-import librosa.display
-import matplotlib.pyplot as plt
 import os
 import uuid
 import soundfile as sf
 import io
+import tempfile
 from streamlit_mic_recorder import mic_recorder
-from quantum_triage import QuantumTriageOptimizer, PatientCase, format_optimization_report
+import pyarrow as pa
+from quantum_triage import (QuantumTriageOptimizer, PatientCase, AllocationTable, BackgroundSolve,
+                            format_optimization_report, severity_bar)
+from profiling import SpanProfiler
+from preprocessing import preprocess_image, compute_mel_spectrogram, render_spectrogram_input
+from tta import augment_image, augment_spectrogram, ensemble_predict, prediction_uncertainty
 
 # ------------------- إعداد الصفحة -------------------
 st.set_page_config(
@@ -75,6 +78,27 @@ if "patients_list" not in st.session_state:
     st.session_state.patients_list = []
 if "optimization_result" not in st.session_state:
     st.session_state.optimization_result = None
+if "prediction_uncertainty" not in st.session_state:
+    st.session_state.prediction_uncertainty = 0.0
+if "background_solve" not in st.session_state:
+    st.session_state.background_solve = None
+if "roster_key" not in st.session_state:
+    st.session_state.roster_key = uuid.uuid4().hex
+if "allocation_table" not in st.session_state:
+    st.session_state.allocation_table = None
+    st.session_state.result_key = None
+if "sweep_result" not in st.session_state:
+    st.session_state.sweep_result = None
+if "profiler" not in st.session_state:
+    st.session_state.profiler = SpanProfiler(window=200)
+
+profiler = st.session_state.profiler
+
+# ------------------- إعدادات القياس (Profiling) -------------------
+with st.sidebar:
+    st.header("⏱️ Profiling")
+    profiler.enable_cprofile = st.checkbox("Capture cProfile per request", value=False)
+    profiler.enable_tracemalloc = st.checkbox("Track peak memory (tracemalloc)", value=False)
 
 # ------------------- تحميل النماذج -------------------
 @st.cache_resource
@@ -102,6 +126,70 @@ if image_model is None or audio_model is None:
     st.error("❌ Failed to load models. Please ensure both model files exist.")
     st.stop()
 
+# ------------------- عرض الجداول (memoized views) -------------------
+# Leading-underscore arguments are not hashed by st.cache_data: the
+# roster key / result key identify the data, so slider moves
+# elsewhere on the page re-use the rendered pages.
+@st.cache_data(max_entries=32)
+def render_patient_page(roster_key, _patients, page, page_size):
+    start = (page - 1) * page_size
+    rows = _patients[start:start + page_size]
+    return pa.table({
+        "Rank": list(range(start + 1, start + len(rows) + 1)),
+        "Name": [p.name for p in rows],
+        "ID": [p.patient_id for p in rows],
+        "Severity": [f"{p.severity_score:.1%}" for p in rows],
+        "Priority": [f"{p.priority_factor:.1%}" for p in rows],
+        "Age": [p.age for p in rows],
+        "Duration (h)": [p.expected_duration_hours for p in rows],
+        "Needs Vent": ["✅" if p.needs_ventilator else "❌" for p in rows],
+    })
+
+
+@st.cache_data(max_entries=32)
+def render_allocation_page(result_key, _table, page, page_size):
+    start = (page - 1) * page_size
+    rows = _table.slice(start, start + page_size)
+    return pa.table({
+        "Rank": rows.rank,
+        "Patient": rows.name,
+        "Severity": [severity_bar(s) for s in rows.severity],
+        "Priority Score": [f"{v:.3f}" for v in rows.priority_value],
+        "Status": ["✅ ALLOCATED" if a else "⏸️ WAITING" for a in rows.allocated],
+        "Duration": [f"{h} h" if a else "-" for h, a in zip(rows.duration_hours, rows.allocated)],
+        "Note": [r or "-" for r in rows.reason],
+    })
+
+
+@st.cache_data(max_entries=8)
+def render_report(result_key, _result):
+    return format_optimization_report(_result)
+
+
+def store_result(result):
+    """Keep a solve result with its columnar table and memoization key"""
+    table = AllocationTable.from_result(result)
+    st.session_state.optimization_result = result
+    st.session_state.allocation_table = table
+    # Summary fields not covered by the allocation columns
+    st.session_state.result_key = (
+        f"{table.fingerprint()}:{result.get('available_ventilators')}:"
+        f"{result.get('total_hours_used')}:{result.get('optimization_status')}"
+    )
+
+
+def paginate(total, key, default_size=50):
+    """Page selector; returns (page, page_size)"""
+    if total <= default_size:
+        return 1, default_size
+    col_page, col_size = st.columns([3, 1])
+    with col_size:
+        page_size = st.selectbox("Rows per page", [25, 50, 100, 250], index=1, key=f"{key}_size")
+    pages = max(1, -(-total // page_size))
+    with col_page:
+        page = st.number_input(f"Page (1-{pages})", min_value=1, max_value=pages, value=1, key=f"{key}_page")
+    return int(page), page_size
+
 # ------------------- الخرائط التصنيفية -------------------
 image_class_map = {0: 'Covid', 1: 'Normal', 2: 'Viral Pneumonia'}
 audio_class_map = {0: 'COVID-19', 1: 'Symptomatic', 2: 'Healthy'}
@@ -151,26 +239,60 @@ with tabs[0]:
             st.error("❌ Failed to save recording")
             st.exception(e)
 
+use_tta = st.checkbox("🧪 Ensemble mode (test-time augmentation)", value=False,
+                      help="Predict on flipped/shifted views in one batch and report confidence")
 predict_button = st.button("Predict")
 
+
+def show_confidence(mean_probs, variance, class_map):
+    """Report TTA confidence and keep it as the default severity uncertainty for triage"""
+    uncertainty = prediction_uncertainty(mean_probs, variance)
+    st.session_state.prediction_uncertainty = uncertainty
+    top = int(np.argmax(mean_probs))
+    st.caption(
+        f"Confidence: {mean_probs[top]:.1%} ± {np.sqrt(variance[top]):.1%} across augmented views · "
+        f"severity uncertainty ±{uncertainty:.2f} (used by Quantum Triage robust mode)"
+    )
+    st.dataframe(
+        [{"Class": class_map[i], "Mean Prob.": f"{mean_probs[i]:.1%}", "Std": f"{np.sqrt(variance[i]):.1%}"}
+         for i in range(len(mean_probs))],
+        hide_index=True
+    )
+
+
 # ------------------- معالجة التنبؤ -------------------
 if uploaded_image is not None or uploaded_audio is not None or st.session_state.recorded_audio_path is not None:
 
     # صورة
     if uploaded_image is not None:
         try:
-            img = Image.open(uploaded_image).convert("RGB")
+            if predict_button:
+                # A prediction is profiled end to end, decode included;
+                # plain reruns only redraw the preview
+                with st.spinner("Processing Image..."), profiler.request("image"):
+                    with profiler.span("image.decode"):
+                        img = Image.open(uploaded_image).convert("RGB")
+                    with profiler.span("image.preprocess"):
+                        new_image = preprocess_image(img)
+                    if use_tta:
+                        with profiler.span("image.tta"):
+                            batch = augment_image(new_image)
+                        with profiler.span("image.predict"):
+                            pred, variance = ensemble_predict(image_model, batch)
+                    else:
+                        with profiler.span("image.predict"):
+                            pred = image_model.predict(new_image)
+                    result = image_class_map[np.argmax(pred)]
+            else:
+                img = Image.open(uploaded_image).convert("RGB")
             img_display = img.copy()
             img_display.thumbnail((400, 400))
             st.image(img_display, caption='Uploaded Image', use_column_width=False)
 
             if predict_button:
-                with st.spinner("Processing Image..."):
-                    new_image = np.array(img.resize((250, 250))).astype("float32") / 255.0
-                    new_image = new_image.reshape(1, 250, 250, 3)
-                    pred = image_model.predict(new_image)
-                    result = image_class_map[np.argmax(pred)]
                 st.success(f"This image represents: **{result}** class")
+                if use_tta:
+                    show_confidence(pred, variance, image_class_map)
 
         except Exception as e:
             st.error(f"Error processing image: {e}")
@@ -187,46 +309,48 @@ if uploaded_image is not None or uploaded_audio is not None or st.session_state.
             if isinstance(audio_source, str):
                 st.audio(audio_source, format="audio/wav")
 
-            with st.spinner("Processing Audio..."):
+            with st.spinner("Processing Audio..."), profiler.request("audio"):
                 y = None
                 sr = None
                 # Read audio using soundfile. Handle both path (str) and uploaded file-like objects.
                 try:
                     import soundfile as sf
-                    if isinstance(audio_source, str):
-                        y, sr = sf.read(audio_source, dtype='float32')
-                    else:
-                        # uploaded_audio is a Streamlit UploadedFile; read bytes and use BytesIO
-                        try:
-                            audio_source.seek(0)
-                        except Exception:
-                            pass
-                        audio_bytes = audio_source.read()
-                        bio = io.BytesIO(audio_bytes)
-                        y, sr = sf.read(bio, dtype='float32')
-
-                    # if stereo, convert to mono
-                    if hasattr(y, 'ndim') and y.ndim > 1:
-                        y = np.mean(y, axis=1)
-                except Exception as inner_e:
-                    # Try converting with pydub (handles webm/ogg/mp3 produced by browser)
-                    try:
-                        from pydub import AudioSegment
+                    with profiler.span("audio.decode.soundfile"):
                         if isinstance(audio_source, str):
-                            seg = AudioSegment.from_file(audio_source)
+                            y, sr = sf.read(audio_source, dtype='float32')
                         else:
+                            # uploaded_audio is a Streamlit UploadedFile; read bytes and use BytesIO
                             try:
                                 audio_source.seek(0)
                             except Exception:
                                 pass
                             audio_bytes = audio_source.read()
-                            seg = AudioSegment.from_file(io.BytesIO(audio_bytes))
+                            bio = io.BytesIO(audio_bytes)
+                            y, sr = sf.read(bio, dtype='float32')
 
-                        wav_bio = io.BytesIO()
-                        seg.export(wav_bio, format="wav")
-                        wav_bio.seek(0)
-                        import soundfile as sf
-                        y, sr = sf.read(wav_bio, dtype='float32')
+                    # if stereo, convert to mono
+                    if hasattr(y, 'ndim') and y.ndim > 1:
+                        y = np.mean(y, axis=1)
+                except Exception as inner_e:
+                    # Try converting with pydub (handles webm/ogg/mp3 produced by browser)
+                    try:
+                        from pydub import AudioSegment
+                        with profiler.span("audio.decode.pydub"):
+                            if isinstance(audio_source, str):
+                                seg = AudioSegment.from_file(audio_source)
+                            else:
+                                try:
+                                    audio_source.seek(0)
+                                except Exception:
+                                    pass
+                                audio_bytes = audio_source.read()
+                                seg = AudioSegment.from_file(io.BytesIO(audio_bytes))
+
+                            wav_bio = io.BytesIO()
+                            seg.export(wav_bio, format="wav")
+                            wav_bio.seek(0)
+                            import soundfile as sf
+                            y, sr = sf.read(wav_bio, dtype='float32')
                         if hasattr(y, 'ndim') and y.ndim > 1:
                             y = np.mean(y, axis=1)
                     except Exception as inner2:
@@ -241,26 +365,25 @@ if uploaded_image is not None or uploaded_audio is not None or st.session_state.
                 except Exception:
                     pass
 
-                mel_spec = librosa.feature.melspectrogram(y=y, sr=sr)
-                mel_spec_db = librosa.power_to_db(mel_spec, ref=np.max)
-
-                fig = plt.figure(figsize=(2.24, 2.24), dpi=100)
-                librosa.display.specshow(mel_spec_db, sr=sr, x_axis='time', y_axis='mel')
-                plt.axis('off')
-                tmp_filename = f"temp_{uuid.uuid4()}.png"
-                plt.savefig(tmp_filename, bbox_inches='tight', pad_inches=0)
-                plt.close(fig)
+                with profiler.span("audio.melspectrogram"):
+                    mel_spec_db = compute_mel_spectrogram(y, sr)
 
-                img = Image.open(tmp_filename).resize((64, 64)).convert('RGB')
-                os.remove(tmp_filename)
+                with profiler.span("audio.render"):
+                    audio_input = render_spectrogram_input(mel_spec_db, sr)
 
-                audio_input = np.array(img) / 255.0
-                audio_input = audio_input.reshape(1, 64, 64, 3)
-
-                pred = audio_model.predict(audio_input)
+                if use_tta:
+                    with profiler.span("audio.tta"):
+                        batch = augment_spectrogram(audio_input)
+                    with profiler.span("audio.predict"):
+                        pred, variance = ensemble_predict(audio_model, batch)
+                else:
+                    with profiler.span("audio.predict"):
+                        pred = audio_model.predict(audio_input)
                 result = audio_class_map[np.argmax(pred)]
 
             st.success(f"This cough audio indicates: **{result}**")
+            if use_tta:
+                show_confidence(pred, variance, audio_class_map)
         except Exception as e:
             st.error("Error processing audio — see details below:")
             st.exception(e)
@@ -268,6 +391,28 @@ if uploaded_image is not None or uploaded_audio is not None or st.session_state.
 elif predict_button:
     st.warning("Please upload a file or record audio before predicting.")
 
+# ------------------- لوحة القياس (Profiling dashboard) -------------------
+with st.sidebar:
+    profile_stats = profiler.stats()
+    if profile_stats:
+        st.caption(f"Rolling window: last {profiler.window} samples per stage")
+        st.dataframe(profile_stats, use_container_width=True, hide_index=True)
+        st.download_button(
+            "📥 Export Profile (JSON)",
+            data=profiler.export_json(),
+            file_name=f"profile_{uuid.uuid4().hex[:8]}.json",
+            mime="application/json",
+            use_container_width=True
+        )
+        for request_name, profile_text in profiler.profiles.items():
+            with st.expander(f"cProfile: {request_name}"):
+                st.code(profile_text, language="text")
+        if st.button("🔄 Reset Profiling", use_container_width=True):
+            profiler.reset()
+            st.rerun()
+    else:
+        st.caption("Run a prediction to collect stage timings.")
+
 # ------------------- تبويب النظام الكوانتمي -------------------
 with tabs[1]:
     st.markdown('<h2 class="title">⚛️ Quantum-Inspired Emergency Triage</h2>', unsafe_allow_html=True)
@@ -301,6 +446,14 @@ with tabs[1]:
         with col_d:
             duration = st.number_input("Est. Duration (hours)", min_value=1, max_value=72, value=24)
         
+        col_e, col_f = st.columns(2)
+        with col_e:
+            severity_std = st.slider("Severity Uncertainty (±)", 0.0, 0.3,
+                                     round(min(0.3, st.session_state.prediction_uncertainty) * 20) / 20, step=0.05,
+                                     help="Spread of the severity estimate, used by Robust mode")
+        with col_f:
+            duration_std = st.number_input("Duration Uncertainty (± hours)", min_value=0, max_value=48, value=0)
+        
         needs_vent = st.checkbox("Needs Ventilator", value=True)
         has_alt = st.checkbox("Has Alternative Treatment Available", value=False)
         
@@ -313,9 +466,12 @@ with tabs[1]:
                 expected_duration_hours=duration,
                 age=age,
                 has_alternative_treatment=has_alt,
-                priority_factor=priority
+                priority_factor=priority,
+                severity_std=severity_std,
+                duration_std_hours=duration_std
             )
             st.session_state.patients_list.append(new_patient)
+            st.session_state.roster_key = uuid.uuid4().hex
             st.success(f"✅ {patient_name} added to queue!")
     
     with col2:
@@ -326,6 +482,13 @@ with tabs[1]:
         max_hours = st.slider("Max Total Ventilator-Hours", min_value=100, max_value=1000, 
                              value=500, step=50)
         
+        robust_mode = st.checkbox("🎲 Robust mode (uncertainty-aware)", value=False,
+                                  help="Monte Carlo sampling of severities/durations")
+        if robust_mode:
+            num_scenarios = st.slider("Scenarios", min_value=50, max_value=1000, value=200, step=50)
+            robust_objective = st.radio("Objective", ["expected", "cvar"], horizontal=True,
+                                        format_func=lambda o: "Expected value" if o == "expected" else "CVaR (worst 10%)")
+        
         st.info(f"""
         **Current Queue:**
         - Patients: {len(st.session_state.patients_list)}
@@ -337,33 +500,104 @@ with tabs[1]:
     if st.session_state.patients_list:
         st.subheader("👥 Current Patient Queue")
         
-        patient_df_data = []
-        for idx, p in enumerate(st.session_state.patients_list, 1):
-            patient_df_data.append({
-                "Rank": idx,
-                "Name": p.name,
-                "ID": p.patient_id,
-                "Severity": f"{p.severity_score:.1%}",
-                "Priority": f"{p.priority_factor:.1%}",
-                "Age": p.age,
-                "Duration (h)": p.expected_duration_hours,
-                "Needs Vent": "✅" if p.needs_ventilator else "❌"
-            })
+        page, page_size = paginate(len(st.session_state.patients_list), "queue")
+        patient_page = render_patient_page(
+            st.session_state.roster_key, st.session_state.patients_list, page, page_size
+        )
+        st.dataframe(patient_page, use_container_width=True, hide_index=True)
         
-        st.dataframe(patient_df_data, use_container_width=True, hide_index=True)
+        run_in_background = st.checkbox(
+            "⏳ Run in background with checkpoints", value=False, disabled=robust_mode,
+            help="For large rosters: the solve survives reruns and resumes from its last checkpoint after a restart"
+        )
         
         # Quantum Optimization Button
         if st.button("🚀 Run Quantum-Inspired Optimization", use_container_width=True, 
-                    help="Compute optimal resource allocation using Simulated Annealing"):
-            with st.spinner("⚛️ Computing optimal allocation via Quantum-Inspired QUBO solver..."):
-                optimizer = QuantumTriageOptimizer(
-                    num_ventilators=num_ventilators,
-                    max_total_hours=max_hours
+                    help="Compute optimal resource allocation using Simulated Annealing",
+                    disabled=st.session_state.background_solve is not None):
+            optimizer = QuantumTriageOptimizer(
+                num_ventilators=num_ventilators,
+                max_total_hours=max_hours
+            )
+            if run_in_background and not robust_mode:
+                # Checkpoint named after the problem, so an identical solve resumes it
+                fingerprint = optimizer.problem_fingerprint(st.session_state.patients_list).hex()
+                checkpoint_path = os.path.join(tempfile.gettempdir(), f"triage_{fingerprint}.ckpt")
+                st.session_state.background_solve = BackgroundSolve(
+                    optimizer, st.session_state.patients_list, checkpoint_path,
+                    seed=int(fingerprint[:8], 16)
                 )
-                result = optimizer.optimize(st.session_state.patients_list)
-                st.session_state.optimization_result = result
-            
-            st.success("✅ Optimization complete!")
+            else:
+                with st.spinner("⚛️ Computing optimal allocation via Quantum-Inspired QUBO solver..."):
+                    if robust_mode:
+                        result = optimizer.optimize_robust(
+                            st.session_state.patients_list,
+                            num_scenarios=num_scenarios,
+                            objective=robust_objective
+                        )
+                    else:
+                        result = optimizer.optimize(st.session_state.patients_list)
+                    store_result(result)
+                
+                st.success("✅ Optimization complete!")
+        
+        background = st.session_state.background_solve
+        if background is not None:
+            if background.done():
+                st.session_state.background_solve = None
+                try:
+                    store_result(background.result())
+                    st.success("✅ Background optimization complete!")
+                except Exception as e:
+                    st.error("❌ Background optimization failed")
+                    st.exception(e)
+            else:
+                progress = background.best_so_far()
+                done_iterations = progress.get("iteration", 0)
+                total_iterations = progress.get("iterations", background.optimizer.iterations)
+                st.progress(done_iterations / max(1, total_iterations),
+                            text=f"⚛️ Annealing: {done_iterations}/{total_iterations} iterations")
+                if progress:
+                    # The final table comes from the ranking pass that runs after annealing
+                    st.caption(f"Annealer state: {progress['best_allocated']} patients in its best "
+                               f"QUBO solution so far (cost {progress['best_cost']:.3f}); "
+                               f"the final allocation is computed when annealing finishes")
+                st.button("🔄 Refresh Progress", use_container_width=True)
+
+        # What-if sweep over capacity scenarios
+        with st.expander("📈 Capacity What-If Sweep (ventilators × hours)"):
+            vent_range = st.slider("Ventilator range", min_value=1, max_value=100,
+                                   value=(1, min(30, max(2, len(st.session_state.patients_list)))))
+            vent_step = st.number_input("Ventilator step", min_value=1, max_value=20, value=1)
+            hour_options = list(range(100, 1050, 50))
+            sweep_hours = st.multiselect("Hour budgets", hour_options, default=[250, 500, 1000])
+
+            if st.button("📈 Run Sweep", use_container_width=True, disabled=not sweep_hours):
+                with st.spinner("⚛️ Evaluating capacity scenarios..."):
+                    optimizer = QuantumTriageOptimizer(
+                        num_ventilators=num_ventilators,
+                        max_total_hours=max_hours
+                    )
+                    st.session_state.sweep_result = optimizer.sweep(
+                        st.session_state.patients_list,
+                        ventilator_counts=range(vent_range[0], vent_range[1] + 1, int(vent_step)),
+                        hour_budgets=sweep_hours
+                    )
+
+            sweep = st.session_state.sweep_result
+            if sweep:
+                lives_chart = {"Ventilators": sweep["ventilator_counts"]}
+                marginal_chart = {"Ventilators": sweep["ventilator_counts"]}
+                for hours_budget in sweep["hour_budgets"]:
+                    rows = [r for r in sweep["scenarios"] if r["max_total_hours"] == hours_budget]
+                    lives_chart[f"{hours_budget} h"] = [r["estimated_lives_saved"] for r in rows]
+                    marginal_chart[f"{hours_budget} h"] = [r["marginal_lives_per_ventilator"] for r in rows]
+
+                st.markdown("**Estimated lives saved**")
+                st.line_chart(lives_chart, x="Ventilators")
+                st.markdown("**Marginal lives saved per added ventilator**")
+                st.line_chart(marginal_chart, x="Ventilators")
+                st.dataframe(sweep["scenarios"], use_container_width=True, hide_index=True)
     
     # Display Optimization Results
     if st.session_state.optimization_result:
@@ -382,32 +616,35 @@ with tabs[1]:
         with col4:
             st.metric("Algorithm", "Quantum-Inspired", delta="QAOA-like")
         
+        if "scenarios" in result:
+            st.caption(
+                f"🎲 {result['scenarios']} scenarios · expected benefit {result['expected_benefit']} · "
+                f"CVaR benefit {result['cvar_benefit']} · hours within budget in "
+                f"{result['hours_feasibility_rate']:.0%} of scenarios · "
+                f"{result['pruned_patients']} dominated patients pruned"
+            )
+        
         # Allocation Table
         st.markdown("### 🎯 Priority Allocation Order")
         
-        alloc_data = []
-        for alloc in result['allocation']:
-            alloc_data.append({
-                "Rank": alloc['rank'],
-                "Patient": alloc['name'],
-                "Severity": f"{'🔴' * int(alloc['severity']*5)}{'⚪' * (5-int(alloc['severity']*5))}",
-                "Priority Score": f"{alloc['priority_value']:.3f}",
-                "Status": "✅ ALLOCATED" if alloc.get('allocated_ventilator') else "⏸️ WAITING",
-                "Duration": f"{alloc.get('duration_hours', '-')} h" if alloc.get('allocated_ventilator') else "-",
-                "Note": alloc.get('reason', '-')
-            })
-        
-        st.dataframe(alloc_data, use_container_width=True, hide_index=True)
+        table = st.session_state.allocation_table
+        page, page_size = paginate(len(table), "allocation")
+        st.dataframe(render_allocation_page(st.session_state.result_key, table, page, page_size),
+                     use_container_width=True, hide_index=True)
         
         # Technical Report
         with st.expander("📋 Detailed Optimization Report"):
-            report = format_optimization_report(result)
+            report = render_report(st.session_state.result_key, result)
             st.code(report, language="text")
         
         # Clear button
         if st.button("🗑️ Clear Queue", use_container_width=True):
             st.session_state.patients_list = []
             st.session_state.optimization_result = None
+            st.session_state.allocation_table = None
+            st.session_state.result_key = None
+            st.session_state.sweep_result = None
+            st.session_state.roster_key = uuid.uuid4().hex
             st.rerun()
 
 # ------------------- تبويب معلومات -------------------
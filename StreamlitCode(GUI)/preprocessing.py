@@ -0,0 +1,52 @@
+"""
+🩻 Model Input Preprocessing
+Shared by the Streamlit app and the benchmark suite
+
+- X-ray: RGB image -> (1, 250, 250, 3) float32 in [0, 1]
+- Cough: waveform -> mel-spectrogram -> rendered image -> (1, 64, 64, 3) in [0, 1]
+"""
+
+import io
+
+import numpy as np
+from PIL import Image
+import librosa
+import librosa.display
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+IMAGE_SIZE = (250, 250)
+SPECTROGRAM_SIZE = (64, 64)
+
+
+def preprocess_image(img: Image.Image) -> np.ndarray:
+    """Resize and normalize an RGB X-ray for the image model"""
+    image = np.array(img.resize(IMAGE_SIZE)).astype("float32") / 255.0
+    return image.reshape(1, IMAGE_SIZE[0], IMAGE_SIZE[1], 3)
+
+
+def compute_mel_spectrogram(y: np.ndarray, sr: int) -> np.ndarray:
+    """Mel-spectrogram in dB (relative to the loudest bin)"""
+    mel_spec = librosa.feature.melspectrogram(y=y, sr=sr)
+    return librosa.power_to_db(mel_spec, ref=np.max)
+
+
+def render_spectrogram_input(mel_spec_db: np.ndarray, sr: int) -> np.ndarray:
+    """
+    Render the spectrogram the same way the training notebook did
+    (specshow, axis off, tight_layout(pad=0), tight bbox) and convert it
+    to the audio model's input tensor
+    """
+    fig = plt.figure(figsize=(2.24, 2.24), dpi=100)
+    librosa.display.specshow(mel_spec_db, sr=sr, x_axis='time', y_axis='mel')
+    plt.axis('off')
+    plt.tight_layout(pad=0)
+    buffer = io.BytesIO()
+    plt.savefig(buffer, format='png', bbox_inches='tight', pad_inches=0)
+    plt.close(fig)
+    buffer.seek(0)
+
+    img = Image.open(buffer).resize(SPECTROGRAM_SIZE).convert('RGB')
+    audio_input = np.array(img) / 255.0
+    return audio_input.reshape(1, SPECTROGRAM_SIZE[0], SPECTROGRAM_SIZE[1], 3)
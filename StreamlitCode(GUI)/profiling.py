@@ -0,0 +1,151 @@
+"""
+⏱️ Lightweight Span Profiler
+Per-stage latency & peak-memory tracking for the inference pipeline
+
+Each request (image or audio prediction) is wrapped in `request()`, and each
+stage inside it (decode, spectrogram, render, predict, ...) in `span()`.
+Optional cProfile / tracemalloc capture can be switched on per request.
+"""
+
+import cProfile
+import io
+import json
+import platform
+import pstats
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from typing import Deque, Dict, List
+
+import numpy as np
+
+
+@dataclass
+class SpanRecord:
+    """Single timed execution of a pipeline stage"""
+    name: str
+    duration_ms: float
+    peak_memory_kb: float  # 0.0 when tracemalloc capture is disabled
+    timestamp: float
+
+
+class SpanProfiler:
+    """
+    Rolling-window span timer
+
+    Keeps the last `window` samples per span name and reports
+    p50/p95/p99 latency and peak memory over that window.
+    """
+
+    def __init__(self, window: int = 200):
+        """
+        Args:
+            window: Number of samples kept per span name
+        """
+        self.window = window
+        self.enable_cprofile = False
+        self.enable_tracemalloc = False
+        self._spans: Dict[str, Deque[SpanRecord]] = {}
+        self._peak_stack: List[int] = []
+        self.profiles: Dict[str, str] = {}  # request name -> last pstats text
+
+    def _record(self, record: SpanRecord):
+        if record.name not in self._spans:
+            self._spans[record.name] = deque(maxlen=self.window)
+        self._spans[record.name].append(record)
+
+    @contextmanager
+    def span(self, name: str):
+        """
+        Time a pipeline stage (and its peak memory if tracemalloc is tracing)
+
+        On Python 3.8 (no `tracemalloc.reset_peak`) the peak is the high-water
+        mark since tracing started, so it can overstate a stage's own peak.
+        """
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            start_mem, _ = tracemalloc.get_traced_memory()
+            if hasattr(tracemalloc, "reset_peak"):  # Python >= 3.9
+                tracemalloc.reset_peak()
+            self._peak_stack.append(0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000.0
+            peak_kb = 0.0
+            if tracing:
+                # Nested spans reset the peak counter, so fold in their peaks
+                _, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, self._peak_stack.pop())
+                if self._peak_stack:
+                    self._peak_stack[-1] = max(self._peak_stack[-1], peak)
+                peak_kb = max(0, peak - start_mem) / 1024.0
+            self._record(SpanRecord(name, duration_ms, peak_kb, time.time()))
+
+    @contextmanager
+    def request(self, name: str):
+        """
+        Wrap a whole request; enables cProfile / tracemalloc if requested
+        """
+        started_tracing = False
+        if self.enable_tracemalloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracing = True
+
+        profiler = None
+        if self.enable_cprofile:
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+        try:
+            with self.span(name):
+                yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                buffer = io.StringIO()
+                pstats.Stats(profiler, stream=buffer).sort_stats("cumulative").print_stats(25)
+                self.profiles[name] = buffer.getvalue()
+            if started_tracing:
+                tracemalloc.stop()
+
+    def stats(self) -> List[Dict]:
+        """Rolling latency percentiles and peak memory per span"""
+        rows = []
+        for name in sorted(self._spans):
+            records = self._spans[name]
+            durations = np.array([r.duration_ms for r in records])
+            p50, p95, p99 = np.percentile(durations, [50, 95, 99])
+            rows.append({
+                "span": name,
+                "count": len(records),
+                "p50_ms": round(float(p50), 2),
+                "p95_ms": round(float(p95), 2),
+                "p99_ms": round(float(p99), 2),
+                "peak_memory_kb": round(max(r.peak_memory_kb for r in records), 1),
+            })
+        return rows
+
+    def reset(self):
+        """Drop all recorded samples and profiles"""
+        self._spans.clear()
+        self.profiles.clear()
+
+    def export_json(self) -> str:
+        """Serialize stats and raw samples for offline comparison across releases"""
+        payload = {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "window": self.window,
+            "stats": self.stats(),
+            "samples": {
+                name: [asdict(r) for r in records]
+                for name, records in self._spans.items()
+            },
+            "profiles": dict(self.profiles),
+        }
+        return json.dumps(payload, indent=2)
+
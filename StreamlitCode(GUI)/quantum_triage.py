@@ -7,8 +7,13 @@ Solves using Simulated Annealing algorithm
 """
 
 import numpy as np
-from dataclasses import dataclass
-from typing import List, Dict, Tuple
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+from dataclasses import dataclass, fields
+from typing import List, Dict, Tuple, Optional, Sequence
 import math
 
 
@@ -23,11 +28,163 @@ class PatientCase:
     age: int
     has_alternative_treatment: bool
     priority_factor: float  # medical urgency (0-1)
+    severity_std: float = 0.0  # uncertainty of severity_score (robust mode)
+    duration_std_hours: float = 0.0  # uncertainty of expected_duration_hours (robust mode)
     
     def __post_init__(self):
         # Clamp severity score
         self.severity_score = max(0.0, min(1.0, self.severity_score))
         self.priority_factor = max(0.0, min(1.0, self.priority_factor))
+        self.severity_std = max(0.0, self.severity_std)
+        self.duration_std_hours = max(0.0, self.duration_std_hours)
+
+
+def severity_std_from_probabilities(probabilities: Sequence[float], max_std: float = 0.25) -> float:
+    """
+    Severity uncertainty from a classifier's softmax output
+
+    Normalized entropy (0 = one-hot, 1 = uniform) scaled to `max_std`.
+    """
+    probs = np.clip(np.asarray(probabilities, dtype=float).ravel(), 1e-12, 1.0)
+    probs = probs / probs.sum()
+    if len(probs) < 2:
+        return 0.0
+    entropy = -np.sum(probs * np.log(probs)) / math.log(len(probs))
+    return float(max_std * entropy)
+
+
+_BIT_MASKS = [np.uint64(1) << np.uint64(k) for k in range(64)]
+
+
+class BitSolution:
+    """
+    Bit-packed 0/1 allocation (64 patients per uint64 word)
+
+    Flips happen in place and counting uses popcount, so an annealing
+    step never copies the solution; memory is n/8 bytes instead of 8n.
+    """
+    __slots__ = ("n", "words")
+
+    def __init__(self, n: int, words: Optional[np.ndarray] = None):
+        self.n = n
+        self.words = np.zeros((n + 63) // 64, dtype=np.uint64) if words is None else words
+
+    @classmethod
+    def from_array(cls, allocation: np.ndarray) -> "BitSolution":
+        bits = np.asarray(allocation).astype(bool)
+        padded = np.zeros(((len(bits) + 63) // 64) * 64, dtype=bool)
+        padded[:len(bits)] = bits
+        words = np.packbits(padded, bitorder="little").view("<u8").astype(np.uint64)
+        return cls(len(bits), words)
+
+    def to_array(self) -> np.ndarray:
+        """Unpacked 0/1 int vector (the representation the rest of the module uses)"""
+        bits = np.unpackbits(self.words.astype("<u8").view(np.uint8), bitorder="little", count=self.n)
+        return bits.astype(int)
+
+    def __len__(self) -> int:
+        return self.n
+
+    def __getitem__(self, i: int) -> int:
+        return 1 if self.words[i >> 6] & _BIT_MASKS[i & 63] else 0
+
+    def flip(self, i: int):
+        """Toggle patient i in place"""
+        self.words[i >> 6] ^= _BIT_MASKS[i & 63]
+
+    def count(self) -> int:
+        """Number of allocated patients (popcount)"""
+        if hasattr(np, "bitwise_count"):  # NumPy >= 2.0
+            return int(np.bitwise_count(self.words).sum())
+        return int(np.unpackbits(self.words.view(np.uint8)).sum())
+
+    def copy(self) -> "BitSolution":
+        return BitSolution(self.n, self.words.copy())
+
+
+@dataclass
+class AnnealCheckpoint:
+    """
+    Resumable simulated-annealing state
+
+    Binary layout (little-endian):
+        header: magic, version, n, iteration, temperature, current/best cost,
+                running benefit and hours of the current solution
+        20-byte problem fingerprint
+        MT19937 RNG state (pos, has_gauss, cached_gaussian, 624-word key)
+        bit-packed current and best solutions
+    """
+    fingerprint: bytes
+    iteration: int  # completed iterations
+    temperature: float
+    current_cost: float
+    best_cost: float
+    benefit: float  # running totals of the current solution, so a resume
+    total_hours: int  # continues with bit-identical floating-point sums
+    current: np.ndarray
+    best: np.ndarray
+    rng_state: tuple  # RandomState.get_state() of the solve's own generator
+
+    MAGIC = b"QTCK"
+    VERSION = 2
+    _HEADER = struct.Struct("<4sHIQddddq")
+    _RNG = struct.Struct("<Iid")
+
+    def to_bytes(self) -> bytes:
+        _, key, pos, has_gauss, cached_gaussian = self.rng_state
+        return b"".join([
+            self._HEADER.pack(self.MAGIC, self.VERSION, len(self.current), self.iteration,
+                              self.temperature, self.current_cost, self.best_cost,
+                              self.benefit, self.total_hours),
+            self.fingerprint,
+            self._RNG.pack(pos, has_gauss, cached_gaussian),
+            np.asarray(key, dtype="<u4").tobytes(),
+            np.packbits(self.current.astype(np.uint8)).tobytes(),
+            np.packbits(self.best.astype(np.uint8)).tobytes(),
+        ])
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "AnnealCheckpoint":
+        (magic, version, n, iteration, temperature, current_cost, best_cost,
+         benefit, total_hours) = cls._HEADER.unpack_from(data, 0)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError("Not a triage annealing checkpoint")
+        offset = cls._HEADER.size
+        fingerprint = data[offset:offset + 20]
+        offset += 20
+        pos, has_gauss, cached_gaussian = cls._RNG.unpack_from(data, offset)
+        offset += cls._RNG.size
+        key = np.frombuffer(data, dtype="<u4", count=624, offset=offset).astype(np.uint32)
+        offset += 624 * 4
+        packed = (n + 7) // 8
+        bits = np.frombuffer(data, dtype=np.uint8, count=2 * packed, offset=offset)
+        current = np.unpackbits(bits[:packed], count=n).astype(int)
+        best = np.unpackbits(bits[packed:], count=n).astype(int)
+        return cls(fingerprint, iteration, temperature, current_cost, best_cost, benefit, total_hours, current, best,
+                   ("MT19937", key, pos, has_gauss, cached_gaussian))
+
+    def save(self, path: str):
+        """
+        Atomic write (a crash never leaves a half-written checkpoint)
+
+        Each write goes through its own temporary file, so concurrent
+        solves sharing a checkpoint path never collide.
+        """
+        directory, name = os.path.split(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(prefix=name + ".", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(self.to_bytes())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> "AnnealCheckpoint":
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
 
 
 class QuantumTriageOptimizer:
@@ -40,6 +197,10 @@ class QuantumTriageOptimizer:
     - Implemented via Simulated Annealing
     """
     
+    # QUBO penalty weights for exceeding the ventilator count / hour budget
+    VENTILATOR_PENALTY = 100
+    HOURS_PENALTY = 50
+    
     def __init__(self, num_ventilators: int, max_total_hours: int = 500):
         """
         Args:
@@ -51,6 +212,7 @@ class QuantumTriageOptimizer:
         self.temperature = 1.0
         self.cooling_rate = 0.95
         self.iterations = 1000
+        self.progress: Dict = {}  # anytime best-so-far, updated while annealing
     
     def _calculate_patient_value(self, patient: PatientCase) -> float:
         """
@@ -74,6 +236,13 @@ class QuantumTriageOptimizer:
         
         return value
     
+    @staticmethod
+    def _scenario_values(severity: np.ndarray, priority: np.ndarray, age: np.ndarray) -> np.ndarray:
+        """Vectorized `_calculate_patient_value` (broadcasts over scenarios × patients)"""
+        prob_success = 1.0 - (0.7 * severity)
+        age_factor = np.maximum(0.5, 1.0 - (age / 150.0) * 0.2)
+        return 0.4 * severity + 0.35 * priority + 0.15 * prob_success + 0.1 * age_factor
+    
     def _calculate_qubo_cost(self, allocation: np.ndarray, patients: List[PatientCase]) -> float:
         """
         Calculate QUBO cost function
@@ -81,77 +250,452 @@ class QuantumTriageOptimizer:
         Minimize: 
             -Σ(value_i * x_i) + λ1 * (constraint_violation) + λ2 * (duration_violation)
         """
-        cost = 0.0
-        
-        # Negative benefit (we want to maximize)
+        # Benefit (negated in the cost because we're minimizing)
         benefit = sum(
             allocation[i] * self._calculate_patient_value(patients[i])
             for i in range(len(patients))
         )
-        cost -= benefit  # Negative because we're minimizing
         
-        # Hard constraint: number of ventilators
+        # Hard constraints: number of ventilators and total hours
         num_allocated = np.sum(allocation)
-        if num_allocated > self.num_ventilators:
-            cost += 100 * (num_allocated - self.num_ventilators) ** 2
-        
-        # Hard constraint: total hours
         total_hours = sum(
             allocation[i] * patients[i].expected_duration_hours
             for i in range(len(patients))
         )
-        if total_hours > self.max_total_hours:
-            cost += 50 * (total_hours - self.max_total_hours) ** 2
         
-        return cost
+        return self._constraint_cost(benefit, num_allocated, total_hours)
     
-    def _simulated_annealing(self, patients: List[PatientCase]) -> np.ndarray:
+    def problem_fingerprint(self, patients: List[PatientCase]) -> bytes:
+        """SHA-1 of everything that determines an annealing run"""
+        digest = hashlib.sha1()
+        digest.update(struct.pack("<qqddq", self.num_ventilators, self.max_total_hours,
+                                  self.temperature, self.cooling_rate, self.iterations))
+        for p in patients:
+            digest.update(struct.pack("<ddqq", p.severity_score, p.priority_factor,
+                                      p.expected_duration_hours, p.age))
+        return digest.digest()
+    
+    def _simulated_annealing(self, patients: List[PatientCase], checkpoint_path: Optional[str] = None,
+                             checkpoint_every: int = 100, seed: Optional[int] = None) -> np.ndarray:
         """
         Quantum-Inspired Simulated Annealing Solver
         
         Mimics quantum tunneling effect through temperature-based exploration
+        
+        Every `checkpoint_every` iterations the best-so-far is published to
+        `self.progress` and, if `checkpoint_path` is set, the full state
+        (solutions, temperature, iteration, RNG) is written there. A run
+        started with an existing checkpoint for the same problem resumes
+        exactly where it stopped. The checkpoint is deleted once the run
+        completes.
+        
+        Random draws come from a per-solve `np.random.RandomState(seed)`, so
+        concurrent solves and other users of the global NumPy RNG never
+        disturb a trajectory (and resuming never touches the global state).
+        
+        The current solution is a `BitSolution`. Moves are scored in O(1)
+        from running benefit/count/hours totals, so a rejected move never
+        touches it, and the best solution is kept as a journal of flips
+        since the last improvement instead of a full copy per step. Once the
+        journal outgrows the bitset it is collapsed into one bitset copy,
+        which stays fixed until the next improvement.
         """
         n = len(patients)
-        current_solution = np.zeros(n, dtype=int)
-        best_solution = current_solution.copy()
+        values = [self._calculate_patient_value(p) for p in patients]
+        hours = [p.expected_duration_hours for p in patients]
+        checkpoint = None
+        fingerprint = self.problem_fingerprint(patients)
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            try:
+                checkpoint = AnnealCheckpoint.load(checkpoint_path)
+            except (ValueError, struct.error):
+                checkpoint = None
+            if checkpoint is not None and checkpoint.fingerprint != fingerprint:
+                checkpoint = None
+        
+        if checkpoint is not None:
+            current_solution = BitSolution.from_array(checkpoint.current)
+            # Flips that turn the current solution back into the best one
+            best_journal = np.flatnonzero(checkpoint.current != checkpoint.best).tolist()
+            best_fixed = None
+            benefit = checkpoint.benefit
+            total_hours = checkpoint.total_hours
+            current_cost = checkpoint.current_cost
+            best_cost = checkpoint.best_cost
+            temp = checkpoint.temperature
+            start = checkpoint.iteration
+            rng = np.random.RandomState()
+            rng.set_state(checkpoint.rng_state)
+        else:
+            rng = np.random.RandomState(seed)
+            current_solution = BitSolution(n)
+            best_journal = []
+            best_fixed = None
+            benefit = 0.0
+            total_hours = 0
+            
+            current_cost = self._constraint_cost(benefit, 0, total_hours)
+            best_cost = current_cost
+            
+            temp = self.temperature
+            start = 0
+        count = current_solution.count()
         
-        current_cost = self._calculate_qubo_cost(current_solution, patients)
-        best_cost = current_cost
+        def best_solution() -> BitSolution:
+            if best_fixed is not None:
+                return best_fixed
+            best = current_solution.copy()
+            for i in best_journal:
+                best.flip(i)
+            return best
         
-        temp = self.temperature
+        self._publish_progress(start, best_solution(), best_cost)
         
-        for iteration in range(self.iterations):
+        for iteration in range(start, self.iterations):
             # Quantum-inspired move: random flip with "tunneling" probability
-            neighbor = current_solution.copy()
+            flip_idx = rng.randint(0, n)
+            sign = -1 if current_solution[flip_idx] else 1  # +1 allocates, -1 releases
             
-            # Flip random patient allocation
-            flip_idx = np.random.randint(0, n)
-            neighbor[flip_idx] = 1 - neighbor[flip_idx]
-            
-            neighbor_cost = self._calculate_qubo_cost(neighbor, patients)
+            neighbor_benefit = benefit + sign * values[flip_idx]
+            neighbor_hours = total_hours + sign * hours[flip_idx]
+            neighbor_cost = self._constraint_cost(neighbor_benefit, count + sign, neighbor_hours)
             
             # Acceptance probability (Metropolis criterion)
             delta_cost = neighbor_cost - current_cost
             
             # Quantum tunneling effect: accept worse solutions at high temp
-            if delta_cost < 0 or np.random.random() < math.exp(-delta_cost / (temp + 1e-10)):
-                current_solution = neighbor
+            if delta_cost < 0 or rng.random_sample() < math.exp(-delta_cost / (temp + 1e-10)):
+                current_solution.flip(flip_idx)
+                if best_fixed is None:
+                    best_journal.append(flip_idx)
+                    if len(best_journal) > len(current_solution.words):
+                        # Undoing would now cost more than a copy: snapshot the best
+                        best_fixed = best_solution()
+                        best_journal.clear()
+                benefit, total_hours, count = neighbor_benefit, neighbor_hours, count + sign
                 current_cost = neighbor_cost
             
-            # Track best solution
+            # Track best solution (current is the best: nothing to undo)
             if current_cost < best_cost:
-                best_solution = current_solution.copy()
+                best_journal.clear()
+                best_fixed = None
                 best_cost = current_cost
             
             # Cool down (quantum annealing schedule)
             temp *= self.cooling_rate
+            
+            completed = iteration + 1
+            if completed % checkpoint_every == 0 or completed == self.iterations:
+                best = best_solution()
+                self._publish_progress(completed, best, best_cost)
+                if checkpoint_path and completed < self.iterations:
+                    AnnealCheckpoint(fingerprint, completed, temp, current_cost, best_cost,
+                                     benefit, total_hours, current_solution.to_array(), best.to_array(),
+                                     rng.get_state()).save(checkpoint_path)
+        
+        if checkpoint_path:
+            try:
+                os.remove(checkpoint_path)
+            except FileNotFoundError:
+                pass  # never written, or already removed by a concurrent identical solve
         
-        return best_solution
+        return best_solution().to_array()
+    
+    def _constraint_cost(self, benefit: float, num_allocated: int, total_hours: int) -> float:
+        """QUBO cost from running totals (the single source of the penalty terms)"""
+        cost = -benefit
+        if num_allocated > self.num_ventilators:
+            cost += self.VENTILATOR_PENALTY * (num_allocated - self.num_ventilators) ** 2
+        if total_hours > self.max_total_hours:
+            cost += self.HOURS_PENALTY * (total_hours - self.max_total_hours) ** 2
+        return cost
+    
+    def _publish_progress(self, iteration: int, best_solution: BitSolution, best_cost: float):
+        # Replace (not mutate) so a polling thread always sees a consistent snapshot
+        self.progress = {
+            "iteration": iteration,
+            "iterations": self.iterations,
+            "best_cost": float(best_cost),
+            "best_allocated": best_solution.count(),
+            "best_solution": best_solution.to_array(),
+        }
     
-    def optimize(self, patients: List[PatientCase]) -> Dict:
+    def sweep(self, patients: List[PatientCase], ventilator_counts: Sequence[int],
+              hour_budgets: Sequence[int]) -> Dict:
+        """
+        What-if sweep over a grid of capacity scenarios
+
+        Every scenario gets exactly the allocation `optimize` would return
+        for that capacity. Patient values are computed and ranked once; one
+        vectorized scan over the ranking yields the greedy benefit at every
+        hour budget for all ventilator counts, and each count extends the
+        previous count's picks. Only patients that need a ventilator compete
+        for one.
+
+        Args:
+            patients: Patient roster
+            ventilator_counts: Ventilator counts to evaluate
+            hour_budgets: Max total ventilator-hours to evaluate
+
+        Returns:
+            Dictionary with one row per scenario, including the marginal
+            estimated lives saved per added ventilator (None for the smallest
+            ventilator count, which has no neighbour to difference against)
+        """
+        candidates = [p for p in patients if p.needs_ventilator]
+        values = np.array([self._calculate_patient_value(p) for p in candidates], dtype=float)
+        # Same ranking as `optimize` (stable, highest value first)
+        order = np.argsort(-values, kind="stable")
+        values = values[order]
+        hours = np.array([candidates[i].expected_duration_hours for i in order], dtype=np.int64)
+        lives = np.array([1.0 - candidates[i].severity_score for i in order], dtype=float)
+        total_hours = int(hours.sum())
+
+        ventilator_counts = sorted(set(int(v) for v in ventilator_counts))
+        hour_budgets = sorted(set(int(h) for h in hour_budgets))
+        positive_counts = [v for v in ventilator_counts if v > 0]
+        searchable = [h for h in hour_budgets
+                      if positive_counts and _budget_searchable(len(values), 1, h, total_hours)]
+        if searchable:
+            lanes = min(max(searchable), total_hours)
+            table = dict(zip(positive_counts, _lane_benefits(values, hours, positive_counts, lanes)))
+
+        picks_by_budget: Dict[int, np.ndarray] = {}
+        cap = max(ventilator_counts, default=0)
+        rows_by_count: Dict[int, List[Dict]] = {v: [] for v in ventilator_counts}
+        for max_total_hours in hour_budgets:
+            for v in ventilator_counts:
+                budget = max_total_hours
+                if v > 0 and max_total_hours in searchable:
+                    budget = _best_budget(table[v][:min(max_total_hours, total_hours) + 1], max_total_hours)
+                if budget not in picks_by_budget:
+                    picks_by_budget[budget] = _greedy_picks(hours, budget, cap)
+                selected = picks_by_budget[budget][:max(v, 0)]
+                rows_by_count[v].append({
+                    "ventilators": v,
+                    "max_total_hours": max_total_hours,
+                    "ventilators_used": int(len(selected)),
+                    "hours_used": int(hours[selected].sum()),
+                    "benefit": round(float(values[selected].sum()), 4),
+                    "estimated_lives_saved": round(sum(lives[selected].tolist()), 2),
+                })
+
+        # Marginal value: extra lives saved per added ventilator at the same hour budget
+        scenarios = []
+        previous: Dict[int, Dict] = {}
+        for row in (r for v in ventilator_counts for r in rows_by_count[v]):
+            prior = previous.get(row["max_total_hours"])
+            if prior is None:
+                row["marginal_lives_per_ventilator"] = None
+            else:
+                gained = row["estimated_lives_saved"] - prior["estimated_lives_saved"]
+                added = row["ventilators"] - prior["ventilators"]
+                row["marginal_lives_per_ventilator"] = round(gained / added, 4)
+            previous[row["max_total_hours"]] = row
+            scenarios.append(row)
+
+        return {
+            "scenarios": scenarios,
+            "ventilator_counts": ventilator_counts,
+            "hour_budgets": hour_budgets,
+            "candidates": len(candidates),
+        }
+
+    def _sample_scenarios(self, patients: List[PatientCase], num_scenarios: int,
+                          rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Sample severity/duration scenarios from per-patient distributions
+
+        Returns:
+            (values, hours, lives) arrays of shape (num_scenarios, n)
+        """
+        n = len(patients)
+        severity = np.array([p.severity_score for p in patients])
+        severity_std = np.array([p.severity_std for p in patients])
+        duration = np.array([p.expected_duration_hours for p in patients], dtype=float)
+        duration_std = np.array([p.duration_std_hours for p in patients])
+        priority = np.array([p.priority_factor for p in patients])
+        age = np.array([p.age for p in patients], dtype=float)
+
+        sampled_severity = np.clip(
+            severity + severity_std * rng.standard_normal((num_scenarios, n)), 0.0, 1.0
+        )
+        sampled_hours = np.maximum(
+            1.0, duration + duration_std * rng.standard_normal((num_scenarios, n))
+        )
+        values = self._scenario_values(sampled_severity, priority, age)
+        return values, sampled_hours, 1.0 - sampled_severity
+
+    def _prune_dominated(self, values: np.ndarray, hours: np.ndarray, chunk: int = 1024) -> np.ndarray:
+        """
+        Indices of patients that can appear in an optimal allocation
+
+        Patient j is pruned when at least `num_ventilators` other patients are
+        worth at least as much and need at most as many hours as j in *every*
+        scenario: any allocation containing j leaves one of them free, and
+        swapping never makes a scenario worse. Dominance must be strict in one
+        dimension; exact ties are broken by index (the earlier patient wins),
+        so tied patients never prune each other.
+        """
+        value_lo, value_hi = values.min(axis=0), values.max(axis=0)
+        hours_lo, hours_hi = hours.min(axis=0), hours.max(axis=0)
+        n = values.shape[1]
+        keep = np.ones(n, dtype=bool)
+        for start in range(0, n, chunk):
+            j = slice(start, start + chunk)
+            weak = (value_lo[:, None] >= value_hi[None, j]) & (hours_hi[:, None] <= hours_lo[None, j])
+            strict = (value_lo[:, None] > value_hi[None, j]) | (hours_hi[:, None] < hours_lo[None, j])
+            earlier = np.arange(n)[:, None] < np.arange(start, min(start + chunk, n))[None, :]
+            dominates = weak & (strict | earlier)
+            keep[j] = dominates.sum(axis=0) < self.num_ventilators
+        return np.flatnonzero(keep)
+
+    def _risk(self, scenario_costs: np.ndarray, objective: str, alpha: float) -> np.ndarray:
+        """Collapse (scenarios × candidates) costs to one objective per candidate"""
+        if objective == "expected":
+            return scenario_costs.mean(axis=0)
+        # CVaR: mean cost of the worst alpha-fraction of scenarios
+        tail = max(1, int(math.ceil(alpha * scenario_costs.shape[0])))
+        worst = np.partition(scenario_costs, -tail, axis=0)[-tail:]
+        return worst.mean(axis=0)
+
+    def _scenario_costs(self, benefit: np.ndarray, hours: np.ndarray, count) -> np.ndarray:
+        """Vectorized `_constraint_cost` per scenario (broadcasts over candidate columns)"""
+        cost = -benefit + self.HOURS_PENALTY * np.maximum(hours - self.max_total_hours, 0) ** 2
+        return cost + self.VENTILATOR_PENALTY * np.maximum(np.asarray(count) - self.num_ventilators, 0) ** 2
+
+    def optimize_robust(self, patients: List[PatientCase], num_scenarios: int = 200,
+                        objective: str = "expected", alpha: float = 0.1,
+                        batch_size: int = 32, seed: int = 0) -> Dict:
+        """
+        Uncertainty-aware allocation via Monte Carlo scenarios
+
+        Severities and durations are sampled from each patient's
+        (`severity_std`, `duration_std_hours`) distribution. The annealer
+        proposes `batch_size` flips per step and scores all of them against
+        every scenario in one vectorized pass.
+
+        Args:
+            patients: Patient roster
+            num_scenarios: Number of sampled scenarios
+            objective: "expected" (mean cost) or "cvar" (mean of worst alpha tail)
+            alpha: Tail fraction for CVaR
+            batch_size: Flip proposals evaluated per annealing step
+            seed: RNG seed
+
+        Returns:
+            Dictionary with the same keys as `optimize` (every patient gets a
+            row, `priority_ranking` indexes into `patients`), plus risk statistics
+        """
+        if objective not in ("expected", "cvar"):
+            raise ValueError(f"Unknown objective: {objective}")
+
+        candidate_indices = [i for i, p in enumerate(patients) if p.needs_ventilator]
+        candidates = [patients[i] for i in candidate_indices]
+
+        rng = np.random.default_rng(seed)
+        values, hours, lives = self._sample_scenarios(candidates, num_scenarios, rng)
+        active = self._prune_dominated(values, hours)
+        active_values, active_hours = values[:, active], hours[:, active]
+
+        # Annealing state (per-scenario running totals)
+        x = np.zeros(len(active), dtype=np.int8)
+        benefit = np.zeros(num_scenarios)
+        used_hours = np.zeros(num_scenarios)
+        count = 0
+        current_obj = float(self._risk(self._scenario_costs(benefit, used_hours, count)[:, None],
+                                       objective, alpha)[0])
+        best_x, best_obj = x.copy(), current_obj
+        temp = self.temperature
+
+        # Nothing to anneal when every candidate was pruned (e.g. no ventilators)
+        for iteration in range(self.iterations if len(active) else 0):
+            flips = rng.integers(0, len(active), size=batch_size)
+            sign = 1 - 2 * x[flips].astype(int)  # +1 add, -1 remove
+            new_benefit = benefit[:, None] + active_values[:, flips] * sign
+            new_hours = used_hours[:, None] + active_hours[:, flips] * sign
+            objs = self._risk(self._scenario_costs(new_benefit, new_hours, count + sign), objective, alpha)
+
+            k = int(np.argmin(objs))
+            delta_cost = objs[k] - current_obj
+            if delta_cost < 0 or rng.random() < math.exp(-delta_cost / (temp + 1e-10)):
+                i = flips[k]
+                x[i] = 1 - x[i]
+                benefit, used_hours = new_benefit[:, k].copy(), new_hours[:, k].copy()
+                count += sign[k]
+                current_obj = float(objs[k])
+                if current_obj < best_obj:
+                    best_x, best_obj = x.copy(), current_obj
+
+            temp *= self.cooling_rate
+
+        selected = np.zeros(len(candidates), dtype=bool)
+        selected[active[best_x == 1]] = True
+
+        scenario_benefit = values[:, selected].sum(axis=1)
+        scenario_hours = hours[:, selected].sum(axis=1)
+        scenario_lives = lives[:, selected].sum(axis=1)
+        tail = max(1, int(math.ceil(alpha * num_scenarios)))
+        mean_values = values.mean(axis=0)
+        mean_hours = hours.mean(axis=0)
+
+        # Rank the whole roster like `optimize`: candidates by expected value,
+        # patients who need no ventilator by their point value
+        candidate_of = {i: c for c, i in enumerate(candidate_indices)}
+        patient_values = [
+            (i, float(mean_values[candidate_of[i]]) if i in candidate_of else self._calculate_patient_value(p), p)
+            for i, p in enumerate(patients)
+        ]
+        patient_values.sort(key=lambda x: x[1], reverse=True)
+
+        allocation_result = []
+        for rank, (i, value, patient) in enumerate(patient_values, 1):
+            c = candidate_of.get(i)
+            entry = {
+                "patient_id": patient.patient_id,
+                "name": patient.name,
+                "severity": patient.severity_score,
+                "priority_value": value,
+                "allocated_ventilator": c is not None and bool(selected[c]),
+                "rank": rank
+            }
+            if c is None:
+                entry["reason"] = "Does not need ventilator"
+            elif selected[c]:
+                entry["duration_hours"] = patient.expected_duration_hours
+            else:
+                entry["reason"] = "Lower expected value under uncertainty"
+            allocation_result.append(entry)
+
+        return {
+            "allocation": allocation_result,
+            "priority_ranking": patient_values,
+            "total_ventilators_used": int(selected.sum()),
+            "total_hours_used": int(sum(candidates[c].expected_duration_hours for c in np.flatnonzero(selected))),
+            "expected_hours_used": round(float(mean_hours[selected].sum()), 1),
+            "available_ventilators": self.num_ventilators,
+            "estimated_lives_saved": round(float(scenario_lives.mean()), 2),
+            "expected_benefit": round(float(scenario_benefit.mean()), 4),
+            "cvar_benefit": round(float(np.sort(scenario_benefit)[:tail].mean()), 4),
+            "hours_feasibility_rate": round(float((scenario_hours <= self.max_total_hours).mean()), 3),
+            "scenarios": num_scenarios,
+            "pruned_patients": len(candidates) - len(active),
+            "optimization_status": (f"✅ Robust allocation over {num_scenarios} scenarios ({objective})"
+                                    if candidates else "No patients needing a ventilator"),
+            "algorithm": "Monte Carlo Simulated Annealing (Stochastic QUBO)"
+        }
+
+    def optimize(self, patients: List[PatientCase], checkpoint_path: Optional[str] = None,
+                 checkpoint_every: int = 100, seed: Optional[int] = None) -> Dict:
         """
         Run quantum-inspired optimization
         
+        Args:
+            patients: Patient roster
+            checkpoint_path: Optional file for periodic annealing checkpoints / resume
+            checkpoint_every: Iterations between checkpoints
+            seed: Annealer RNG seed (None = fresh entropy)
+        
         Returns:
             Dictionary with allocation results and priority ranking
         """
@@ -166,7 +710,7 @@ class QuantumTriageOptimizer:
             }
         
         # Run simulated annealing solver
-        optimal_allocation = self._simulated_annealing(patients)
+        optimal_allocation = self._simulated_annealing(patients, checkpoint_path, checkpoint_every, seed)
         
         # Calculate priority ranking (sorted by value)
         patient_values = [
@@ -176,8 +720,12 @@ class QuantumTriageOptimizer:
         patient_values.sort(key=lambda x: x[1], reverse=True)
         
         # Allocate resources based on ranking (greedy on sorted list)
+        ranked = [(value, patient.expected_duration_hours)
+                  for _, value, patient in patient_values if patient.needs_ventilator]
         ventilators_remaining = self.num_ventilators
-        hours_remaining = self.max_total_hours
+        hours_remaining = _greedy_budget(np.array([v for v, _ in ranked], dtype=float),
+                                         np.array([h for _, h in ranked], dtype=np.int64),
+                                         self.num_ventilators, self.max_total_hours)
         allocation_result = []
         
         for idx, value, patient in patient_values:
@@ -221,8 +769,8 @@ class QuantumTriageOptimizer:
         
         # Estimate lives saved (heuristic based on severity and allocation)
         estimated_saved = sum(
-            (1.0 - patient.severity_score) if alloc.get("allocated_ventilator") else 0
-            for alloc, patient in zip(allocation_result, patients)
+            (1.0 - alloc["severity"]) if alloc.get("allocated_ventilator") else 0
+            for alloc in allocation_result
         )
         
         return {
@@ -237,6 +785,195 @@ class QuantumTriageOptimizer:
         }
 
 
+class BackgroundSolve:
+    """
+    Runs `optimize` on a daemon thread
+
+    Poll `best_so_far()` while it runs and `result()` once `done()`.
+    """
+
+    def __init__(self, optimizer: QuantumTriageOptimizer, patients: List[PatientCase],
+                 checkpoint_path: Optional[str] = None, checkpoint_every: int = 100,
+                 seed: Optional[int] = None):
+        self.optimizer = optimizer
+        self._result: Optional[Dict] = None
+        self.error: Optional[BaseException] = None
+        self._thread = threading.Thread(
+            target=self._run, args=(list(patients), checkpoint_path, checkpoint_every, seed), daemon=True
+        )
+        self._thread.start()
+
+    def _run(self, patients: List[PatientCase], checkpoint_path: Optional[str], checkpoint_every: int,
+             seed: Optional[int]):
+        try:
+            self._result = self.optimizer.optimize(patients, checkpoint_path, checkpoint_every, seed)
+        except BaseException as e:
+            self.error = e
+
+    def done(self) -> bool:
+        return not self._thread.is_alive()
+
+    def best_so_far(self) -> Dict:
+        """Latest published annealing progress (empty before the first update)"""
+        return self.optimizer.progress
+
+    def result(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Final result, waiting up to `timeout` seconds; re-raises solver errors"""
+        self._thread.join(timeout)
+        if self.error is not None:
+            raise self.error
+        return self._result
+
+
+# Largest (hour budgets x candidates) table the budget search scans; beyond
+# it allocation falls back to the plain greedy pass at the full budget
+BUDGET_SEARCH_LIMIT = 20_000_000
+
+
+def _lane_benefits(values: np.ndarray, hours: np.ndarray, counts: Sequence[int],
+                   max_budget: int) -> np.ndarray:
+    """
+    Benefit of the value-ordered greedy pass at every hour budget 0..max_budget
+
+    One vectorized scan over the (value-sorted) candidates, with one lane per
+    integer budget. A count v keeps the first v picks of its lane, so every
+    count is a warm start of the previous one.
+
+    Returns:
+        (len(counts), max_budget + 1) array of benefits
+    """
+    counts = list(counts)
+    cap = max(counts)
+    slot = np.full(cap + 1, -1)
+    slot[counts] = np.arange(len(counts))
+    budget = np.arange(max_budget + 1)
+    used = np.zeros(max_budget + 1, dtype=np.int64)
+    picked = np.zeros(max_budget + 1, dtype=np.int64)
+    benefit = np.zeros(max_budget + 1)
+    at_count = np.full((len(counts), max_budget + 1), np.nan)
+    if slot[0] >= 0:
+        at_count[slot[0]] = 0.0
+
+    live = budget
+    for value, h in zip(values, hours):
+        lanes = live[used[live] + h <= live]
+        used[lanes] += h
+        picked[lanes] += 1
+        benefit[lanes] += value
+        s = slot[picked[lanes]]
+        recorded = s >= 0
+        at_count[s[recorded], lanes[recorded]] = benefit[lanes[recorded]]
+        live = live[picked[live] < cap]
+        if not len(live):
+            break
+
+    # Lanes that ran out of candidates keep everything they picked
+    unset = np.isnan(at_count)
+    at_count[unset] = np.broadcast_to(benefit, at_count.shape)[unset]
+    return at_count
+
+
+def _budget_searchable(num_candidates: int, num_ventilators: int, max_total_hours: int,
+                       total_hours: int) -> bool:
+    lanes = min(max_total_hours, total_hours) + 1
+    return num_candidates > 0 and num_ventilators > 0 and lanes > 0 \
+        and lanes * num_candidates <= BUDGET_SEARCH_LIMIT
+
+
+def _best_budget(benefit: np.ndarray, max_total_hours: int) -> int:
+    """Largest budget with the highest benefit (the full budget when it ties)"""
+    best = len(benefit) - 1 - int(np.argmax(benefit[::-1]))
+    return max_total_hours if best == len(benefit) - 1 else best
+
+
+def _greedy_budget(values: np.ndarray, hours: np.ndarray, num_ventilators: int,
+                   max_total_hours: int) -> int:
+    """
+    Hour budget for the value-ordered greedy pass
+
+    Skipping a patient who does not fit can let a long high-value case
+    crowd out several shorter ones once the budget grows. Running the pass
+    at the best budget <= `max_total_hours` keeps the allocation's benefit
+    non-decreasing in both ventilators and hours.
+    """
+    total_hours = int(hours.sum())
+    if not _budget_searchable(len(values), num_ventilators, max_total_hours, total_hours):
+        return max_total_hours
+    lanes = min(max_total_hours, total_hours)
+    return _best_budget(_lane_benefits(values, hours, [num_ventilators], lanes)[0], max_total_hours)
+
+
+def _greedy_picks(hours: np.ndarray, budget: int, cap: int) -> np.ndarray:
+    """Indices picked (in order) by the value-ordered greedy pass, up to `cap`"""
+    picks, used = [], 0
+    for i, h in enumerate(hours.tolist()):
+        if len(picks) >= cap:
+            break
+        if used + h <= budget:
+            picks.append(i)
+            used += h
+    return np.array(picks, dtype=np.int64)
+
+
+SEVERITY_BARS = ["🔴" * k + "⚪" * (5 - k) for k in range(6)]
+
+
+def severity_bar(severity: float) -> str:
+    """Five-dot emoji severity bar"""
+    return SEVERITY_BARS[int(severity * 5)]
+
+
+@dataclass
+class AllocationTable:
+    """
+    Columnar view of an optimization result (one array per field)
+
+    Built once per result; cheap to slice for paginated display
+    and to fingerprint for memoization.
+    """
+    rank: np.ndarray
+    patient_id: List[str]
+    name: List[str]
+    severity: np.ndarray
+    priority_value: np.ndarray
+    allocated: np.ndarray
+    duration_hours: np.ndarray  # 0 when not allocated
+    reason: List[str]  # "" when allocated
+
+    @classmethod
+    def from_result(cls, result: Dict) -> "AllocationTable":
+        allocation = result.get("allocation", [])
+        return cls(
+            rank=np.array([a["rank"] for a in allocation], dtype=np.int64),
+            patient_id=[a["patient_id"] for a in allocation],
+            name=[a["name"] for a in allocation],
+            severity=np.array([a["severity"] for a in allocation], dtype=float),
+            priority_value=np.array([a["priority_value"] for a in allocation], dtype=float),
+            allocated=np.array([bool(a.get("allocated_ventilator")) for a in allocation], dtype=bool),
+            duration_hours=np.array([a.get("duration_hours", 0) if a.get("allocated_ventilator") else 0
+                                     for a in allocation], dtype=np.int64),
+            reason=[a.get("reason", "") for a in allocation],
+        )
+
+    def __len__(self) -> int:
+        return len(self.rank)
+
+    def slice(self, start: int, stop: int) -> "AllocationTable":
+        """Rows [start, stop) as a new table"""
+        return AllocationTable(**{f.name: getattr(self, f.name)[start:stop] for f in fields(self)})
+
+    def fingerprint(self) -> str:
+        """Content hash, used as the memoization key for rendered views"""
+        digest = hashlib.sha1()
+        for f in fields(self):
+            column = getattr(self, f.name)
+            if isinstance(column, np.ndarray):
+                digest.update(column.tobytes())
+            else:
+                digest.update("\x1f".join(column).encode())
+        return digest.hexdigest()
+
+
 def format_optimization_report(result: Dict) -> str:
     """Format optimization result as readable report"""
     report = f"""
@@ -259,19 +996,19 @@ def format_optimization_report(result: Dict) -> str:
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 """
     
+    parts = [report]
     for i, alloc in enumerate(result['allocation'], 1):
         status = "✅ ALLOCATED" if alloc.get('allocated_ventilator') else "⏸️  WAITING/ALTERNATIVE"
-        severity_bar = "🔴" * int(alloc['severity'] * 5) + "⚪" * (5 - int(alloc['severity'] * 5))
         
-        report += f"\n{i}. {alloc['name']} (ID: {alloc['patient_id']})\n"
-        report += f"   Severity: {severity_bar} ({alloc['severity']:.1%})\n"
-        report += f"   Priority Score: {alloc['priority_value']:.3f}\n"
-        report += f"   Status: {status}\n"
+        parts.append(f"\n{i}. {alloc['name']} (ID: {alloc['patient_id']})\n")
+        parts.append(f"   Severity: {severity_bar(alloc['severity'])} ({alloc['severity']:.1%})\n")
+        parts.append(f"   Priority Score: {alloc['priority_value']:.3f}\n")
+        parts.append(f"   Status: {status}\n")
         
         if alloc.get('duration_hours'):
-            report += f"   Duration: {alloc['duration_hours']} hours\n"
+            parts.append(f"   Duration: {alloc['duration_hours']} hours\n")
         if alloc.get('reason'):
-            report += f"   Note: {alloc['reason']}\n"
+            parts.append(f"   Note: {alloc['reason']}\n")
     
-    report += "\n" + "="*66 + "\n"
-    return report
+    parts.append("\n" + "="*66 + "\n")
+    return "".join(parts)
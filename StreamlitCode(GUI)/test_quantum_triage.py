@@ -3,13 +3,17 @@
 Run this to verify the module works correctly
 """
 
+import math
 import sys
 import os
+import tempfile
+
+import numpy as np
 
 # Add current directory to path for imports
 sys.path.insert(0, os.path.dirname(__file__))
 
-from quantum_triage import QuantumTriageOptimizer, PatientCase, format_optimization_report
+from quantum_triage import QuantumTriageOptimizer, PatientCase, BitSolution, format_optimization_report
 
 def demo_quantum_triage():
     """Run a demonstration of the Quantum Triage System"""
@@ -144,9 +148,214 @@ def demo_quantum_triage():
     print("="*70 + "\n")
 
 
+def _seeded_roster(n, seed):
+    rng = np.random.default_rng(seed)
+    return [
+        PatientCase(f"R{i}", "x", float(rng.beta(2, 2.5)), bool(rng.random() < 0.7),
+                    int(rng.integers(6, 73)), int(rng.integers(18, 95)), False, float(rng.random()))
+        for i in range(n)
+    ]
+
+
+def test_robust_mode_with_tied_patients():
+    """Robust mode must not prune every patient when several are identical"""
+    # App defaults: severity/priority 0.5, age 40, 24 h, no uncertainty
+    identical = [PatientCase(f"P{i}", "x", 0.5, True, 24, 40, False, 0.5) for i in range(5)]
+    result = QuantumTriageOptimizer(2, 500).optimize_robust(identical)
+    assert result["total_ventilators_used"] == 2
+    assert result["pruned_patients"] == 3
+
+    tied_severe = [PatientCase(f"S{i}", "x", 0.9, True, 24, 40, False, 0.9) for i in range(3)]
+    milder = PatientCase("M0", "x", 0.3, True, 24, 40, False, 0.3)
+    result = QuantumTriageOptimizer(2, 500).optimize_robust(tied_severe + [milder])
+    assert result["total_ventilators_used"] == 2
+    allocated = {a["patient_id"] for a in result["allocation"] if a["allocated_ventilator"]}
+    assert "M0" not in allocated
+
+    # No ventilators: everything is pruned, the solver must still return
+    result = QuantumTriageOptimizer(0, 500).optimize_robust(identical)
+    assert result["total_ventilators_used"] == 0
+
+
+def test_robust_mode_lists_every_patient():
+    """Robust results keep patients who need no ventilator and index the caller's roster"""
+    patients = _seeded_roster(50, 0)
+    result = QuantumTriageOptimizer(10, 500).optimize_robust(patients)
+    assert len(result["allocation"]) == len(patients)
+    assert [a["rank"] for a in result["allocation"]] == list(range(1, len(patients) + 1))
+    for alloc, (i, _, patient) in zip(result["allocation"], result["priority_ranking"]):
+        assert patients[i] is patient and alloc["patient_id"] == patient.patient_id
+        if not patient.needs_ventilator:
+            assert not alloc["allocated_ventilator"] and alloc["reason"] == "Does not need ventilator"
+
+    no_candidates = [p for p in patients if not p.needs_ventilator]
+    result = QuantumTriageOptimizer(10, 500).optimize_robust(no_candidates)
+    assert len(result["allocation"]) == len(no_candidates)
+    assert result["total_ventilators_used"] == 0
+
+
+def test_sweep_is_monotone_and_matches_optimize():
+    """More ventilators or hours never lower the benefit, and each row is what `optimize` returns"""
+    for seed in range(5):
+        patients = _seeded_roster(60, seed)
+        sweep = QuantumTriageOptimizer(10, 500).sweep(patients, range(1, 31), range(100, 1050, 50))
+        grid = {(r["ventilators"], r["max_total_hours"]): r for r in sweep["scenarios"]}
+        for (v, h), row in grid.items():
+            for smaller in ((v - 1, h), (v, h - 50)):
+                if smaller in grid:
+                    assert row["benefit"] >= grid[smaller]["benefit"]
+
+        for v, h in [(1, 1000), (10, 500), (30, 300)]:
+            result = QuantumTriageOptimizer(v, h).optimize(patients, seed=0)
+            row = grid[(v, h)]
+            assert result["estimated_lives_saved"] == row["estimated_lives_saved"]
+            assert result["total_ventilators_used"] == row["ventilators_used"]
+            assert result["total_hours_used"] == row["hours_used"]
+
+
+
+def test_bit_solution_round_trip_and_count():
+    """Packing survives word boundaries, and both popcount paths agree"""
+    rng = np.random.default_rng(0)
+    for n in (1, 63, 64, 65, 127, 128, 130):
+        for allocation in (np.zeros(n, dtype=int), np.ones(n, dtype=int), rng.integers(0, 2, n)):
+            solution = BitSolution.from_array(allocation)
+            assert len(solution.words) == (n + 63) // 64
+            assert np.array_equal(solution.to_array(), allocation)
+            assert [solution[i] for i in range(n)] == allocation.tolist()
+            assert solution.count() == allocation.sum()
+
+            flipped = solution.copy()
+            for i in (0, n // 2, n - 1):
+                flipped.flip(i)
+            expected = allocation.copy()
+            for i in {0, n // 2, n - 1}:
+                expected[i] ^= 1
+            assert np.array_equal(flipped.to_array(), expected)
+            assert np.array_equal(solution.to_array(), allocation)
+
+            # NumPy < 2.0 has no bitwise_count: exercise the unpackbits fallback
+            bitwise_count = getattr(np, "bitwise_count", None)
+            if bitwise_count is not None:
+                del np.bitwise_count
+            try:
+                assert solution.count() == allocation.sum()
+            finally:
+                if bitwise_count is not None:
+                    np.bitwise_count = bitwise_count
+
+
+def _dense_anneal(optimizer, patients, seed, checkpoint_every):
+    """The annealing loop with a full copy of the best solution on every improvement"""
+    values = [optimizer._calculate_patient_value(p) for p in patients]
+    hours = [p.expected_duration_hours for p in patients]
+    rng = np.random.RandomState(seed)
+    current = np.zeros(len(patients), dtype=int)
+    best = current.copy()
+    benefit, total_hours, count = 0.0, 0, 0
+    current_cost = best_cost = optimizer._constraint_cost(benefit, count, total_hours)
+    temp = optimizer.temperature
+    snapshots, max_distance = [], 0
+    for iteration in range(optimizer.iterations):
+        i = rng.randint(0, len(patients))
+        sign = -1 if current[i] else 1
+        neighbor_benefit = benefit + sign * values[i]
+        neighbor_hours = total_hours + sign * hours[i]
+        neighbor_cost = optimizer._constraint_cost(neighbor_benefit, count + sign, neighbor_hours)
+        delta_cost = neighbor_cost - current_cost
+        if delta_cost < 0 or rng.random_sample() < math.exp(-delta_cost / (temp + 1e-10)):
+            current[i] ^= 1
+            benefit, total_hours, count = neighbor_benefit, neighbor_hours, count + sign
+            current_cost = neighbor_cost
+        if current_cost < best_cost:
+            best, best_cost = current.copy(), current_cost
+        max_distance = max(max_distance, int((current != best).sum()))
+        temp *= optimizer.cooling_rate
+        if (iteration + 1) % checkpoint_every == 0:
+            snapshots.append(best.copy())
+    return best, snapshots, max_distance
+
+
+def test_best_journal_matches_dense_reference():
+    """Journalled and collapsed best solutions equal full copies at every checkpoint"""
+    for seed in range(3):
+        patients = _seeded_roster(150, seed)
+        optimizer = QuantumTriageOptimizer(20, 600)
+        optimizer.iterations = 3000
+        optimizer.cooling_rate = 0.999  # stay hot long enough to accept worsening moves
+        expected, expected_snapshots, max_distance = _dense_anneal(optimizer, patients, seed, 50)
+        # The run must drift further from its best than the journal allows, forcing a collapse
+        assert max_distance > (len(patients) + 63) // 64
+
+        snapshots = []
+        publish = optimizer._publish_progress
+
+        def record(iteration, best, cost):
+            publish(iteration, best, cost)
+            if iteration:
+                snapshots.append(best.to_array())
+
+        optimizer._publish_progress = record
+        result = optimizer._simulated_annealing(patients, checkpoint_every=50, seed=seed)
+        assert np.array_equal(result, expected)
+        assert len(snapshots) == len(expected_snapshots)
+        assert all(np.array_equal(a, b) for a, b in zip(snapshots, expected_snapshots))
+
+
+class _Interrupted(Exception):
+    pass
+
+
+def test_checkpoint_resume_is_bit_exact():
+    """An interrupted, resumed anneal ends exactly where an uninterrupted one does"""
+    patients = _seeded_roster(300, 1)
+
+    def fresh():
+        optimizer = QuantumTriageOptimizer(30, 900)
+        optimizer.iterations = 2000
+        return optimizer
+
+    reference = fresh()._simulated_annealing(patients, seed=11)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "anneal.ckpt")
+        interrupted = fresh()
+        publish = interrupted._publish_progress
+
+        def stop_midway(iteration, best, cost):
+            publish(iteration, best, cost)
+            if iteration == 700:
+                raise _Interrupted
+
+        interrupted._publish_progress = stop_midway
+        try:
+            interrupted._simulated_annealing(patients, path, checkpoint_every=100, seed=11)
+        except _Interrupted:
+            pass
+        assert os.path.exists(path)
+
+        # The seed is ignored on resume: the RNG state comes from the checkpoint
+        resumed = fresh()._simulated_annealing(patients, path, checkpoint_every=100, seed=None)
+        assert np.array_equal(resumed, reference)
+        assert not os.path.exists(path)
+        assert os.listdir(directory) == []
+
+
 if __name__ == "__main__":
     try:
         demo_quantum_triage()
+        test_robust_mode_with_tied_patients()
+        print("✅ Robust mode tie check passed")
+        test_robust_mode_lists_every_patient()
+        print("✅ Robust mode roster check passed")
+        test_sweep_is_monotone_and_matches_optimize()
+        print("✅ Sweep monotonicity check passed")
+        test_bit_solution_round_trip_and_count()
+        print("✅ Bit solution packing check passed")
+        test_best_journal_matches_dense_reference()
+        print("✅ Best-solution journal check passed")
+        test_checkpoint_resume_is_bit_exact()
+        print("✅ Checkpoint resume check passed")
     except Exception as e:
         print(f"\n❌ Error during demo: {e}")
         import traceback
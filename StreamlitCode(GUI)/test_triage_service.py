@@ -0,0 +1,131 @@
+"""
+✅ Tests for the Event-Driven Triage Service
+Run with pytest, or directly: python test_triage_service.py
+"""
+
+import asyncio
+import json
+import os
+import random
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(__file__))
+
+from quantum_triage import PatientCase
+from triage_service import PriorityIndex, TriageEvent, TriageService
+
+
+def _expected_rank(index: PriorityIndex, values: dict, patient_id: str) -> int:
+    bucket = index._to_bucket(values[patient_id])
+    return 1 + sum(1 for v in values.values() if index._to_bucket(v) > bucket)
+
+
+def test_priority_index_rank_after_push_update_remove():
+    """Fenwick ranks and the heap top match a brute-force ordering through every operation"""
+    rng = random.Random(0)
+    index = PriorityIndex(resolution=1 << 10)
+    values = {}
+
+    def check():
+        assert len(index) == len(values)
+        for patient_id in values:
+            assert index.rank(patient_id) == _expected_rank(index, values, patient_id)
+        if values:
+            top_id, top_value = index.peek()
+            assert top_value == max(values.values()) and values[top_id] == top_value
+
+    for step in range(400):
+        op = rng.random()
+        if op < 0.5 or not values:
+            patient_id = f"P{step}"
+            values[patient_id] = rng.random()
+            index.push(patient_id, values[patient_id])
+        elif op < 0.8:
+            patient_id = rng.choice(sorted(values))
+            values[patient_id] = rng.random()
+            index.update(patient_id, values[patient_id])
+        else:
+            patient_id = rng.choice(sorted(values))
+            del values[patient_id]
+            index.remove(patient_id)
+        check()
+
+    # Equal values share a rank
+    index = PriorityIndex()
+    for patient_id, value in [("A", 0.9), ("B", 0.5), ("C", 0.5), ("D", 0.1)]:
+        index.push(patient_id, value)
+    assert [index.rank(p) for p in "ABCD"] == [1, 2, 2, 4]
+
+
+class _CountingExecutor(ThreadPoolExecutor):
+    def __init__(self):
+        super().__init__(max_workers=1)
+        self.solves = 0
+
+    def submit(self, fn, *args, **kwargs):
+        self.solves += 1
+        return super().submit(fn, *args, **kwargs)
+
+
+def _patient(i: int) -> PatientCase:
+    return PatientCase(f"P{i}", f"Patient {i}", 0.3 + 0.05 * (i % 10), True, 24, 50, False, 0.5)
+
+
+def test_burst_of_events_produces_one_diff():
+    """A burst inside the debounce window costs one solve and one published diff"""
+    async def scenario():
+        executor = _CountingExecutor()
+        service = TriageService(3, 500, debounce_seconds=0.05, executor=executor)
+        await service.start()
+        diffs = service.subscribe()
+        try:
+            for i in range(20):
+                await service.submit(TriageEvent("arrival", f"P{i}", _patient(i)))
+            diff = await asyncio.wait_for(diffs.get(), timeout=5)
+            await asyncio.sleep(0.3)
+            assert executor.solves == 1
+            assert diffs.empty()
+            assert diff["version"] == 1 and diff["total_allocated"] == 3
+            assert len(diff["allocated"]) == 3 and diff["released"] == []
+        finally:
+            await service.stop()
+            executor.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_client_survives_malformed_messages():
+    """Valid JSON that is not an object is answered with an error, not a dropped connection"""
+    async def scenario():
+        executor = ThreadPoolExecutor(max_workers=1)
+        service = TriageService(3, 500, debounce_seconds=0.05, executor=executor)
+        await service.start()
+        server = await service.serve("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            replies = []
+            for line in ("[1, 2]", "42", '{"type": "rank", "patient_id": "nobody"}',
+                         json.dumps({"type": "arrival", "patient": vars(_patient(1))})):
+                writer.write((line + "\n").encode())
+                await writer.drain()
+                replies.append(json.loads(await asyncio.wait_for(reader.readline(), timeout=5)))
+            assert all("error" in reply for reply in replies[:3])
+            assert replies[3] == {"queued": "arrival"}
+        finally:
+            writer.close()
+            server.close()
+            await server.wait_closed()
+            await service.stop()
+            executor.shutdown()
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    test_priority_index_rank_after_push_update_remove()
+    test_burst_of_events_produces_one_diff()
+    test_client_survives_malformed_messages()
+    print("✅ Triage service checks passed")
@@ -0,0 +1,424 @@
+"""
+📡 Event-Driven Triage Service
+Live priority queue + debounced re-optimization on asyncio
+
+- Ingests arrival / update / discharge events from a local queue or a
+  JSON-lines TCP socket
+- Keeps patients in a heap-indexed priority queue keyed by
+  `QuantumTriageOptimizer._calculate_patient_value`
+- Batches bursts of events into one solve, run on a worker pool so the
+  event loop never blocks
+- Pushes allocation diffs to subscribers
+
+Run standalone:
+    python triage_service.py --port 8765 --ventilators 10 --hours 500
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from quantum_triage import QuantumTriageOptimizer, PatientCase
+
+EVENT_KINDS = ("arrival", "update", "discharge")
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TriageEvent:
+    """Patient lifecycle event"""
+    kind: str  # "arrival", "update" or "discharge"
+    patient_id: str
+    patient: Optional[PatientCase] = None  # required for arrival/update
+
+    def __post_init__(self):
+        if self.kind not in EVENT_KINDS:
+            raise ValueError(f"Unknown event kind: {self.kind}")
+        if self.kind != "discharge" and self.patient is None:
+            raise ValueError(f"'{self.kind}' event requires a patient")
+
+
+class PriorityIndex:
+    """
+    Indexed max-heap of patients by value, plus a Fenwick tree over
+    quantized values for rank queries
+
+    push / update / remove / rank are O(log n), peek is O(1).
+    Patients with equal (quantized) value share a rank.
+    """
+
+    def __init__(self, resolution: int = 1 << 20):
+        """
+        Args:
+            resolution: Number of value buckets in [0, 1] used for ranking
+        """
+        self.resolution = resolution
+        self._heap: List[Tuple[float, str]] = []  # (value, patient_id)
+        self._position: Dict[str, int] = {}
+        self._bucket: Dict[str, int] = {}
+        self._tree = [0] * (resolution + 1)  # 1-based Fenwick tree
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __contains__(self, patient_id: str) -> bool:
+        return patient_id in self._position
+
+    # --- Fenwick tree (counts per value bucket) ---
+
+    def _to_bucket(self, value: float) -> int:
+        return int(min(max(value, 0.0), 1.0) * (self.resolution - 1)) + 1
+
+    def _tree_add(self, bucket: int, delta: int):
+        while bucket <= self.resolution:
+            self._tree[bucket] += delta
+            bucket += bucket & -bucket
+
+    def _tree_prefix(self, bucket: int) -> int:
+        total = 0
+        while bucket > 0:
+            total += self._tree[bucket]
+            bucket -= bucket & -bucket
+        return total
+
+    # --- Heap maintenance ---
+
+    def _swap(self, i: int, j: int):
+        heap = self._heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self._position[heap[i][1]] = i
+        self._position[heap[j][1]] = j
+
+    def _sift_up(self, i: int):
+        while i > 0:
+            parent = (i - 1) // 2
+            if self._heap[i][0] <= self._heap[parent][0]:
+                break
+            self._swap(i, parent)
+            i = parent
+
+    def _sift_down(self, i: int):
+        n = len(self._heap)
+        while True:
+            largest = i
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < n and self._heap[child][0] > self._heap[largest][0]:
+                    largest = child
+            if largest == i:
+                break
+            self._swap(i, largest)
+            i = largest
+
+    # --- Public API ---
+
+    def push(self, patient_id: str, value: float):
+        """Insert a patient, or move it if it is already indexed"""
+        if patient_id in self._position:
+            self.update(patient_id, value)
+            return
+        self._heap.append((value, patient_id))
+        self._position[patient_id] = len(self._heap) - 1
+        self._bucket[patient_id] = self._to_bucket(value)
+        self._tree_add(self._bucket[patient_id], 1)
+        self._sift_up(len(self._heap) - 1)
+
+    def update(self, patient_id: str, value: float):
+        """Change a patient's value"""
+        i = self._position[patient_id]
+        old_value = self._heap[i][0]
+        self._heap[i] = (value, patient_id)
+        self._tree_add(self._bucket[patient_id], -1)
+        self._bucket[patient_id] = self._to_bucket(value)
+        self._tree_add(self._bucket[patient_id], 1)
+        if value > old_value:
+            self._sift_up(i)
+        else:
+            self._sift_down(i)
+
+    def remove(self, patient_id: str):
+        """Drop a patient from the index"""
+        i = self._position.pop(patient_id)
+        self._tree_add(self._bucket.pop(patient_id), -1)
+        last = self._heap.pop()
+        if i < len(self._heap):
+            self._heap[i] = last
+            self._position[last[1]] = i
+            self._sift_up(i)
+            self._sift_down(self._position[last[1]])
+
+    def peek(self) -> Optional[Tuple[str, float]]:
+        """Highest-value patient as (patient_id, value)"""
+        if not self._heap:
+            return None
+        value, patient_id = self._heap[0]
+        return patient_id, value
+
+    def rank(self, patient_id: str) -> int:
+        """1-based priority rank (1 = highest value)"""
+        bucket = self._bucket[patient_id]
+        return len(self._heap) - self._tree_prefix(bucket) + 1
+
+    def value(self, patient_id: str) -> float:
+        return self._heap[self._position[patient_id]][0]
+
+
+def _solve(num_ventilators: int, max_total_hours: int, patients: List[PatientCase]) -> Set[str]:
+    """Worker-pool entry point: allocated patient IDs for a roster snapshot"""
+    optimizer = QuantumTriageOptimizer(num_ventilators=num_ventilators, max_total_hours=max_total_hours)
+    result = optimizer.optimize(patients)
+    return {a["patient_id"] for a in result["allocation"] if a.get("allocated_ventilator")}
+
+
+class TriageService:
+    """
+    Asyncio triage service
+
+    Events are applied to the priority index immediately; re-optimization
+    is debounced so a burst of events costs one solve.
+    """
+
+    def __init__(self, num_ventilators: int, max_total_hours: int = 500,
+                 debounce_seconds: float = 0.5, executor: Optional[Executor] = None,
+                 max_wait_seconds: Optional[float] = None):
+        """
+        Args:
+            num_ventilators: Available ventilators
+            max_total_hours: Maximum total ventilator-hours available
+            debounce_seconds: Quiet period before a batched re-optimization
+            executor: Worker pool for solves (default: 1-process pool)
+            max_wait_seconds: Longest a continuous event stream can delay a
+                solve (default: 5 x debounce_seconds)
+        """
+        self.num_ventilators = num_ventilators
+        self.max_total_hours = max_total_hours
+        self.debounce_seconds = debounce_seconds
+        self.max_wait_seconds = 5 * debounce_seconds if max_wait_seconds is None else max_wait_seconds
+        self.events: asyncio.Queue = asyncio.Queue()
+        self.index = PriorityIndex()
+        self.patients: Dict[str, PatientCase] = {}
+        self.allocated: Set[str] = set()
+        self.version = 0
+
+        self._optimizer = QuantumTriageOptimizer(num_ventilators, max_total_hours)
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._subscribers: List[asyncio.Queue] = []
+        self._dirty = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    # --- Ingestion ---
+
+    async def submit(self, event: TriageEvent):
+        """Queue an event for processing"""
+        await self.events.put(event)
+
+    def apply(self, event: TriageEvent):
+        """Apply an event to the roster and priority index (O(log n))"""
+        if event.kind == "discharge":
+            if event.patient_id in self.patients:
+                del self.patients[event.patient_id]
+                self.index.remove(event.patient_id)
+        else:
+            self.patients[event.patient_id] = event.patient
+            self.index.push(event.patient_id, self._optimizer._calculate_patient_value(event.patient))
+        self._dirty.set()
+
+    async def _consume(self):
+        while True:
+            event = await self.events.get()
+            self.apply(event)
+            self.events.task_done()
+
+    # --- Re-optimization ---
+
+    async def _optimize_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._dirty.wait()
+            # Debounce: wait until no new events arrive for `debounce_seconds`,
+            # but never longer than `max_wait_seconds` after the first one
+            deadline = loop.time() + self.max_wait_seconds
+            while True:
+                self._dirty.clear()
+                await asyncio.sleep(max(0.0, min(self.debounce_seconds, deadline - loop.time())))
+                if not self._dirty.is_set() or loop.time() >= deadline:
+                    break
+
+            snapshot = list(self.patients.values())
+            try:
+                allocated = await loop.run_in_executor(
+                    self._executor, _solve, self.num_ventilators, self.max_total_hours, snapshot
+                )
+            except BrokenProcessPool:
+                logger.exception("Solver pool died; restarting it")
+                if self._owns_executor:
+                    self._executor.shutdown(wait=False)
+                    self._executor = ProcessPoolExecutor(max_workers=1)
+                    self._dirty.set()  # retry the lost solve on the fresh pool
+                continue
+            except Exception:
+                # Keep the last published allocation; the next event re-triggers a solve
+                logger.exception("Re-optimization failed")
+                continue
+            # Patients discharged while the solve was running keep no ventilator
+            allocated &= set(self.patients)
+            self._publish(allocated)
+
+    def _publish(self, allocated: Set[str]):
+        added = sorted(allocated - self.allocated)
+        released = sorted(self.allocated - allocated)
+        if not added and not released:
+            return
+        self.allocated = allocated
+        self.version += 1
+        diff = {
+            "version": self.version,
+            "allocated": added,
+            "released": released,
+            "total_allocated": len(allocated),
+        }
+        for queue in self._subscribers:
+            queue.put_nowait(diff)
+
+    # --- Queries / subscriptions ---
+
+    def subscribe(self) -> asyncio.Queue:
+        """Queue receiving allocation diffs"""
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+
+    def rank(self, patient_id: str) -> int:
+        """Current priority rank of a patient (O(log n))"""
+        return self.index.rank(patient_id)
+
+    # --- Lifecycle ---
+
+    async def start(self):
+        """Start event consumption and the re-optimization loop"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=1)
+        self._tasks = [
+            asyncio.create_task(self._consume()),
+            asyncio.create_task(self._optimize_loop()),
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._owns_executor and self._executor is not None:
+            if sys.version_info >= (3, 9):
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            else:
+                self._executor.shutdown(wait=False)
+            self._executor = None
+
+    # --- Socket ingestion ---
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        JSON-lines protocol:
+            {"type": "arrival"|"update", "patient": {...PatientCase fields...}}
+            {"type": "discharge", "patient_id": "..."}
+            {"type": "rank", "patient_id": "..."}
+            {"type": "subscribe"}
+        """
+        subscription = None
+        forwarder = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                    if not isinstance(message, dict):
+                        raise ValueError("Expected a JSON object")
+                    kind = message.get("type")
+                    if kind == "rank":
+                        reply = {"patient_id": message["patient_id"], "rank": self.rank(message["patient_id"])}
+                    elif kind == "subscribe":
+                        if subscription is None:
+                            subscription = self.subscribe()
+                            forwarder = asyncio.create_task(self._forward(subscription, writer))
+                        reply = {"subscribed": True}
+                    else:
+                        await self.submit(event_from_message(message))
+                        reply = {"queued": kind}
+                except (ValueError, KeyError, TypeError) as e:
+                    reply = {"error": str(e)}
+                writer.write((json.dumps(reply) + "\n").encode())
+                await writer.drain()
+        finally:
+            if forwarder is not None:
+                forwarder.cancel()
+            if subscription is not None:
+                self.unsubscribe(subscription)
+            writer.close()
+
+    async def _forward(self, subscription: asyncio.Queue, writer: asyncio.StreamWriter):
+        while True:
+            diff = await subscription.get()
+            writer.write((json.dumps({"diff": diff}) + "\n").encode())
+            await writer.drain()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765):
+        """Accept JSON-lines events on a local TCP socket"""
+        return await asyncio.start_server(self._handle_client, host, port)
+
+
+def event_from_message(message: Dict) -> TriageEvent:
+    """Build a TriageEvent from a decoded JSON message"""
+    kind = message.get("type")
+    if kind == "discharge":
+        return TriageEvent(kind=kind, patient_id=message["patient_id"])
+    patient = PatientCase(**message["patient"])
+    return TriageEvent(kind=kind, patient_id=patient.patient_id, patient=patient)
+
+
+def event_to_message(event: TriageEvent) -> Dict:
+    """Inverse of `event_from_message`"""
+    if event.kind == "discharge":
+        return {"type": event.kind, "patient_id": event.patient_id}
+    return {"type": event.kind, "patient": asdict(event.patient)}
+
+
+async def _main(args):
+    service = TriageService(args.ventilators, args.hours, debounce_seconds=args.debounce,
+                            max_wait_seconds=args.max_wait)
+    await service.start()
+    server = await service.serve(args.host, args.port)
+    print(f"📡 Triage service listening on {args.host}:{args.port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Event-driven triage service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ventilators", type=int, default=10)
+    parser.add_argument("--hours", type=int, default=500)
+    parser.add_argument("--debounce", type=float, default=0.5)
+    parser.add_argument("--max-wait", type=float, default=None)
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(_main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,88 @@
+"""
+🧪 Test-Time Augmentation (TTA) Ensemble
+One batched forward pass -> mean probabilities + variance
+
+All augmented views of a request are stacked into a single batch so the
+extra robustness costs one `predict` call instead of N.
+"""
+
+import math
+from typing import Sequence, Tuple
+
+import numpy as np
+
+from quantum_triage import severity_std_from_probabilities
+
+IMAGE_SHIFTS = [(0, 8), (0, -8), (8, 0), (-8, 0)]  # (dy, dx) pixels on 250x250
+SPECTROGRAM_TIME_SHIFTS = [-6, -3, 3, 6]  # pixels along the time axis on 64x64
+# Brightness jitter: scales the rendered RGB pixel values (already in [0, 1]).
+# This is not an audio gain — a louder cough changes the dB colour map
+# differently — it only perturbs the image intensity the model sees.
+SPECTROGRAM_INTENSITY_JITTER = [0.9, 1.1]
+
+
+def _shift(batch: np.ndarray, dy: int, dx: int) -> np.ndarray:
+    """
+    Translate (N, H, W, C) images, filling the uncovered border by
+    repeating the edge pixels (Keras ImageDataGenerator's "nearest" fill,
+    as used in training)
+    """
+    h, w = batch.shape[1:3]
+    pad_y, pad_x = abs(dy), abs(dx)
+    padded = np.pad(batch, ((0, 0), (pad_y, pad_y), (pad_x, pad_x), (0, 0)), mode="edge")
+    top, left = pad_y - dy, pad_x - dx
+    return padded[:, top:top + h, left:left + w]
+
+
+def augment_image(image: np.ndarray, shifts: Sequence[Tuple[int, int]] = IMAGE_SHIFTS) -> np.ndarray:
+    """
+    X-ray TTA batch: original, horizontal flip and small shifts
+
+    Args:
+        image: (1, H, W, 3) preprocessed image
+    """
+    views = [image, image[:, :, ::-1]]
+    views += [_shift(image, dy, dx) for dy, dx in shifts]
+    return np.concatenate(views, axis=0)
+
+
+def augment_spectrogram(spectrogram: np.ndarray,
+                        time_shifts: Sequence[int] = SPECTROGRAM_TIME_SHIFTS,
+                        intensity_scales: Sequence[float] = SPECTROGRAM_INTENSITY_JITTER) -> np.ndarray:
+    """
+    Cough TTA batch: original, circular time shifts and intensity jitter
+
+    Applied to the rendered spectrogram tensor, so no extra
+    mel-spectrogram / matplotlib renders are needed.
+
+    Args:
+        spectrogram: (1, 64, 64, 3) audio model input
+        intensity_scales: pixel-value multipliers (brightness, not audio gain)
+    """
+    views = [spectrogram]
+    views += [np.roll(spectrogram, shift, axis=2) for shift in time_shifts]
+    views += [np.clip(spectrogram * scale, 0.0, 1.0) for scale in intensity_scales]
+    return np.concatenate(views, axis=0)
+
+
+def ensemble_predict(model, batch: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Single batched forward pass over all augmented views
+
+    Returns:
+        (mean_probabilities, variance) per class
+    """
+    probs = np.asarray(model.predict(batch, verbose=0))
+    return probs.mean(axis=0), probs.var(axis=0)
+
+
+def prediction_uncertainty(mean_probs: np.ndarray, variance: np.ndarray, max_std: float = 0.25) -> float:
+    """
+    Combined uncertainty in [0, max_std] for use as `PatientCase.severity_std`
+
+    Mixes the normalized entropy of the mean prediction with the spread
+    of the predicted class across augmented views.
+    """
+    entropy_std = severity_std_from_probabilities(mean_probs, max_std=max_std)
+    spread = math.sqrt(float(variance[int(np.argmax(mean_probs))]))
+    return float(min(max_std, math.sqrt(entropy_std ** 2 + spread ** 2)))